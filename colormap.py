@@ -0,0 +1,42 @@
+import numpy as np
+
+# heatmap colors shared by the network displays. values are clamped to [-1, 1] and fade from white at 0 to green at 1
+# and red at -1. the fade is quantized to 256 levels, so every color comes out of a precomputed palette instead of
+# being formatted per cell
+NUM_LEVELS = 256
+
+# palettes are indexed by level, where level 255 is white and level 0 is full strength
+POSITIVE_HEX = np.array(['#{:02x}ff{:02x}'.format(level, level) for level in range(NUM_LEVELS)])
+NEGATIVE_HEX = np.array(['#ff{:02x}{:02x}'.format(level, level) for level in range(NUM_LEVELS)])
+POSITIVE_RGB = np.array([[level, 255, level] for level in range(NUM_LEVELS)], dtype=np.uint8)
+NEGATIVE_RGB = np.array([[255, level, level] for level in range(NUM_LEVELS)], dtype=np.uint8)
+
+
+def get_levels(values):
+    # returns the palette level of each value and a mask of the values that use the negative palette. nan is
+    # treated as 0, and halves round to even like the round() the displays used before
+    values = np.clip(np.nan_to_num(np.asarray(values, dtype=float)), -1, 1)
+    levels = np.rint((NUM_LEVELS - 1) * (1 - np.abs(values))).astype(np.intp)
+    return levels, values < 0
+
+
+def get_hex_colors(values):
+    # an array of '#rrggbb' strings with the shape of values
+    levels, negative = get_levels(values)
+    return np.where(negative, NEGATIVE_HEX[levels], POSITIVE_HEX[levels])
+
+
+def get_hex_color(value):
+    levels, negative = get_levels(value)
+    if negative:
+        return str(NEGATIVE_HEX[levels])
+    return str(POSITIVE_HEX[levels])
+
+
+def get_rgb_colors(values, out=None):
+    # a uint8 [..., 3] image of values, written into out when it is given
+    levels, negative = get_levels(values)
+    if out is None:
+        out = np.empty(levels.shape + (3,), dtype=np.uint8)
+    out[...] = np.where(negative[..., None], NEGATIVE_RGB[levels], POSITIVE_RGB[levels])
+    return out
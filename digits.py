@@ -1,35 +1,334 @@
 import tkinter as tk
 import sys
-import random
+import copy
+import queue
+import threading
+import time
 import numpy as np
+import os
+import math
+import argparse
+import csv
+import itertools
+import zlib
+import multiprocessing
+import tracemalloc
 from tkinter import ttk
+import colormap
 
 
+class SGD:
+    # optimizers apply the weight changes worked out by backpropogation. deltas point the way the weights should move,
+    # so every optimizer adds its step to the parameters in place. the delta arrays are used as scratch space and
+    # are overwritten, which keeps updates free of temporary arrays
+    def __init__(self):
+        self.state = {}
+
+    def reset(self):
+        self.state = {}
+
+    def update(self, params, deltas, learning_rate):
+        for name in params:
+            deltas[name] *= learning_rate
+            params[name] += deltas[name]
+
+    def get_state(self, name, param, num_arrays):
+        # per-parameter state arrays, recreated when the parameter changes shape (e.g. a new hidden_size)
+        arrays = self.state.get(name)
+        if arrays is None or arrays[0].shape != param.shape or arrays[0].dtype != param.dtype:
+            arrays = [np.zeros_like(param) for i in range(num_arrays)]
+            self.state[name] = arrays
+        return arrays
+
+
+############################################################################################################
+class Momentum(SGD):
+    def __init__(self, momentum=0.9):
+        SGD.__init__(self)
+        self.momentum = momentum
+
+    def update(self, params, deltas, learning_rate):
+        for name in params:
+            velocity, = self.get_state(name, params[name], 1)
+            velocity *= self.momentum
+            deltas[name] *= learning_rate
+            velocity += deltas[name]
+            params[name] += velocity
+
+
+############################################################################################################
+class Adam(SGD):
+    def __init__(self, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        SGD.__init__(self)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.num_steps = 0
+
+    def reset(self):
+        SGD.reset(self)
+        self.num_steps = 0
+
+    def update(self, params, deltas, learning_rate):
+        self.num_steps += 1
+        m_correction = 1 - self.beta1 ** self.num_steps
+        v_correction = 1 - self.beta2 ** self.num_steps
+        for name in params:
+            m, v, scratch = self.get_state(name, params[name], 3)
+            delta = deltas[name]
+            m *= self.beta1
+            np.multiply(delta, 1 - self.beta1, out=scratch)
+            m += scratch
+            v *= self.beta2
+            np.square(delta, out=scratch)
+            scratch *= 1 - self.beta2
+            v += scratch
+            np.divide(v, v_correction, out=scratch)
+            np.sqrt(scratch, out=scratch)
+            scratch += self.epsilon
+            np.divide(m, m_correction, out=delta)
+            delta *= learning_rate
+            delta /= scratch
+            params[name] += delta
+
+
+############################################################################################################
+class StepSchedule:
+    # learning rate schedules scale the base learning rate by how many epochs the network has trained
+    def __init__(self, step_size, gamma=0.5):
+        self.step_size = step_size
+        self.gamma = gamma
+
+    def get_learning_rate(self, learning_rate, epoch):
+        return learning_rate * self.gamma ** (epoch // self.step_size)
+
+
+############################################################################################################
+class CosineSchedule:
+    # anneals from the base learning rate to min_fraction of it over num_epochs, then stays there
+    def __init__(self, num_epochs, min_fraction=0.0):
+        self.num_epochs = num_epochs
+        self.min_fraction = min_fraction
+
+    def get_learning_rate(self, learning_rate, epoch):
+        progress = min(epoch, self.num_epochs) / self.num_epochs
+        return learning_rate * (self.min_fraction + (1 - self.min_fraction) * 0.5 * (1 + math.cos(math.pi * progress)))
+
+
+OPTIMIZERS = {'sgd': SGD, 'momentum': Momentum, 'adam': Adam}
+# learning rates each optimizer converges well with on the digits items, from the default initial weights with online
+# training. adam at 0.02 or more drives the tanh hidden units into saturation, where their gradient vanishes
+DEFAULT_LEARNING_RATES = {'sgd': 0.5, 'momentum': 0.05, 'adam': 0.007}
+SCHEDULES = ['none', 'step', 'cosine']
+
+
+def create_schedule(name, num_epochs):
+    # step halves the learning rate every quarter of num_epochs, cosine anneals it over num_epochs
+    if name == 'step':
+        return StepSchedule(max(1, num_epochs // 4))
+    elif name == 'cosine':
+        return CosineSchedule(num_epochs)
+    return None
+
+
+############################################################################################################
+############################################################################################################
 class Network:
     ############################################################################################################
-    def __init__(self, input_size, hidden_size, output_size):
+    # hidden_size is the size of the single hidden layer, or a list of hidden layer sizes from the input side.
+    # activations names the activation of each hidden layer and the output layer, by default tanh for the hidden
+    # layers and sigmoid for the output. the layers are stored as lists of weight matrices, [out_size, in_size], and
+    # bias vectors, and h_x, h_bias, o_h and o_bias name the first and last of them. they start normally distributed
+    # with weight_stdev; much smaller starting weights leave the hidden units nearly identical for a long time.
+    # dtype is the float type of the weights and of training, e.g. float32 for speed. with preallocate, train_epoch
+    # steps through reusable activation, delta and gradient buffers (one set per batch size) updated in place, so a
+    # training step allocates no arrays
+    activation_list = ['tanh', 'sigmoid', 'relu', 'linear']
+
+    def __init__(self, input_size, hidden_size, output_size, optimizer=None, learning_rate_schedule=None,
+                 weight_stdev=0.1, activations=None, dtype='float64', preallocate=False):
 
         self.input_size = input_size
         self.output_size = output_size
+        self.activations = activations
+        self.dtype = np.dtype(dtype)
+        self.preallocate = preallocate
+        self.buffers = {}
         self.weight_mean = 0
-        self.weight_stdev = 0.0001
+        self.weight_stdev = weight_stdev
+
+        # the optimizer turns backpropogation's deltas into weight updates, and the schedule, if there is one,
+        # adjusts the learning rate passed to train_epoch by epochs_trained
+        if optimizer is None:
+            optimizer = SGD()
+        self.optimizer = optimizer
+        self.learning_rate_schedule = learning_rate_schedule
+        self.epochs_trained = 0
+
+        # feedforward results of single inputs, keyed on (weight_version, input bytes). weight_version is bumped
+        # whenever the weights change, which empties the cache
+        self.weight_version = 0
+        self.activation_cache = {}
+        self.activation_cache_size = 64
+        self.activation_cache_hits = 0
+        self.activation_cache_misses = 0
 
         self.init_network(hidden_size)
 
     ############################################################################################################
     def init_network(self, hidden_size):
-        self.hidden_size = hidden_size
-        self.h_bias = np.random.normal(0, self.weight_stdev, [self.hidden_size])
-        self.h_x = np.random.normal(0, self.weight_stdev, [self.hidden_size, self.input_size])
+        self.set_layer_sizes(hidden_size)
+        self.biases = []
+        self.weights = []
+        for i in range(self.num_layers):
+            self.biases.append(np.random.normal(0, self.weight_stdev, [self.layer_sizes[i+1]]).astype(self.dtype))
+            self.weights.append(np.random.normal(0, self.weight_stdev,
+                                                 [self.layer_sizes[i+1], self.layer_sizes[i]]).astype(self.dtype))
+        self.buffers = {}
+        self.optimizer.reset()
+        self.epochs_trained = 0
+        self.weights_changed()
+
+    ############################################################################################################
+    def set_layer_sizes(self, hidden_size):
+        # activations must name one activation per layer; None picks the default ones
+        if np.ndim(hidden_size) == 0:
+            hidden_sizes = [int(hidden_size)]
+        else:
+            hidden_sizes = [int(size) for size in hidden_size]
+        num_layers = len(hidden_sizes) + 1
+        if self.activations is None:
+            self.activations = ['tanh'] * (num_layers - 1) + ['sigmoid']
+        if len(self.activations) != num_layers:
+            raise ValueError("{} activations given for a network with {} layers".format(len(self.activations),
+                                                                                     num_layers))
+        for name in self.activations:
+            if name not in self.activation_list:
+                raise ValueError("unknown activation {}, expected one of {}".format(name, self.activation_list))
+        self.layer_sizes = [self.input_size] + hidden_sizes + [self.output_size]
+        self.num_layers = num_layers
+        self.hidden_size = hidden_sizes[0]
+
+    ############################################################################################################
+    @property
+    def h_x(self):
+        return self.weights[0]
+
+    @property
+    def h_bias(self):
+        return self.biases[0]
+
+    @property
+    def o_h(self):
+        return self.weights[-1]
+
+    @property
+    def o_bias(self):
+        return self.biases[-1]
+
+    ############################################################################################################
+    def get_buffers(self, num_rows):
+        # the preallocated arrays for training on batches of num_rows items, including the params and deltas dicts
+        # handed to the optimizer. they refer to the current weight arrays, so they are dropped with them
+        buffers = self.buffers.get(num_rows)
+        if buffers is None:
+            layer_shapes = [[num_rows, size] for size in self.layer_sizes[1:]]
+            buffers = {'x': np.empty([num_rows, self.input_size], self.dtype),
+                       'y': np.empty([num_rows, self.output_size], self.dtype),
+                       'cost': np.empty([num_rows, self.output_size], self.dtype),
+                       'square_cost': np.empty([num_rows, self.output_size], self.dtype),
+                       'activations': [np.empty(shape, self.dtype) for shape in layer_shapes],
+                       'deltas': [np.empty(shape, self.dtype) for shape in layer_shapes],
+                       'primes': [np.empty(shape, self.dtype) for shape in layer_shapes],
+                       'params': {}, 'param_deltas': {}}
+            for i in range(self.num_layers):
+                buffers['params']['bias' + str(i)] = self.biases[i]
+                buffers['params']['weights' + str(i)] = self.weights[i]
+                buffers['param_deltas']['bias' + str(i)] = np.empty_like(self.biases[i])
+                buffers['param_deltas']['weights' + str(i)] = np.empty_like(self.weights[i])
+            self.buffers[num_rows] = buffers
+        return buffers
+
+    ############################################################################################################
+    def train_batch(self, x, y, batch_indexes, learning_rate):
+        # one forward and backward pass over the rows batch_indexes of x and y, done entirely in the buffers from
+        # get_buffers; the same steps as forward and backpropogation. x and y must already be of the network's dtype.
+        # returns the summed squared cost of the batch
+        buffers = self.get_buffers(len(batch_indexes))
+        layer_activations = buffers['activations']
+        deltas = buffers['deltas']
+        primes = buffers['primes']
+        param_deltas = buffers['param_deltas']
+        np.take(x, batch_indexes, axis=0, out=buffers['x'])
+        np.take(y, batch_indexes, axis=0, out=buffers['y'])
+
+        layer_input = buffers['x']
+        for i in range(self.num_layers):
+            np.dot(layer_input, self.weights[i].transpose(), out=layer_activations[i])
+            layer_activations[i] += self.biases[i]
+            getattr(self, self.activations[i])(layer_activations[i], layer_activations[i])
+            layer_input = layer_activations[i]
+
+        o_cost = np.subtract(buffers['y'], layer_activations[-1], out=buffers['cost'])
+        getattr(self, self.activations[-1] + '_prime')(layer_activations[-1], deltas[-1])
+        deltas[-1] *= o_cost
+        for i in range(self.num_layers - 1, -1, -1):
+            if i > 0:
+                layer_input = layer_activations[i-1]
+            else:
+                layer_input = buffers['x']
+            np.sum(deltas[i], axis=0, out=param_deltas['bias' + str(i)])
+            np.dot(deltas[i].transpose(), layer_input, out=param_deltas['weights' + str(i)])
+            if i > 0:
+                np.dot(deltas[i], self.weights[i], out=deltas[i-1])
+                getattr(self, self.activations[i-1] + '_prime')(layer_input, primes[i-1])
+                deltas[i-1] *= primes[i-1]
+        self.optimizer.update(buffers['params'], param_deltas, learning_rate)
+        self.weights_changed()
+        return np.square(o_cost, out=buffers['square_cost']).sum()
+
+    ############################################################################################################
+    def weights_changed(self):
+        self.weight_version += 1
+        self.activation_cache.clear()
+
+    ############################################################################################################
+    def get_activations(self, x):
+        # cached feedforward for the display, which redraws the same input many times between weight changes.
+        # the returned arrays are shared with the cache and must not be modified
+        key = (self.weight_version, x.tobytes())
+        activations = self.activation_cache.get(key)
+        if activations is not None:
+            self.activation_cache_hits += 1
+            return activations
+        self.activation_cache_misses += 1
+        if len(self.activation_cache) >= self.activation_cache_size:
+            self.activation_cache.clear()
+        activations = self.feedforward(x)
+        self.activation_cache[key] = activations
+        return activations
+
+    ############################################################################################################
+    def get_cache_stats(self):
+        return {'weight_version': self.weight_version, 'hits': self.activation_cache_hits,
+                'misses': self.activation_cache_misses, 'entries': len(self.activation_cache)}
 
-        self.o_bias = np.random.normal(0, self.weight_stdev, [self.output_size])
-        self.o_h = np.random.normal(0, self.weight_stdev, [self.output_size, self.hidden_size])
+    ############################################################################################################
+    def forward(self, x):
+        # x is either one input vector or a [n_items, input_size] batch with one item per row. returns the
+        # activations of every layer after the input, the output layer last
+        layer_activations = []
+        a = x
+        for i in range(self.num_layers):
+            a = getattr(self, self.activations[i])(np.dot(a, self.weights[i].transpose()) + self.biases[i])
+            layer_activations.append(a)
+        return layer_activations
 
     ############################################################################################################
     def feedforward(self, x):
-        h = self.tanh(np.dot(self.h_x, x) + self.h_bias)
-        o = self.sigmoid(np.dot(self.o_h, h) + self.o_bias)
-        return h, o
+        # the first hidden layer and output layer activations, which is what the display shows
+        layer_activations = self.forward(x)
+        return layer_activations[0], layer_activations[-1]
 
     ############################################################################################################
     @staticmethod
@@ -38,43 +337,231 @@ class Network:
         # absolute value of the difference
 
     ############################################################################################################
-    def backpropogation(self, x, o, h, o_cost, learning_rate):
-        o_delta = o_cost * self.sigmoid_prime(o)
+    def backpropogation(self, x, layer_activations, o_cost, learning_rate):
+        # layer_activations comes from forward. for a batch the rows of x, the activations and o_cost are items, and
+        # their weight changes are summed. each derivative is worked out from the layer's activation, which is all
+        # the activation functions need. all deltas are worked out before the optimizer changes any weights
+        deltas = {}
+        params = {}
+        delta = np.atleast_2d(o_cost * getattr(self, self.activations[-1] + '_prime')(layer_activations[-1]))
+        for i in range(self.num_layers - 1, -1, -1):
+            if i > 0:
+                layer_input = np.atleast_2d(layer_activations[i-1])
+            else:
+                layer_input = np.atleast_2d(x)
+            deltas['bias' + str(i)] = delta.sum(0)
+            deltas['weights' + str(i)] = np.dot(delta.transpose(), layer_input)
+            params['bias' + str(i)] = self.biases[i]
+            params['weights' + str(i)] = self.weights[i]
+            if i > 0:
+                delta = np.dot(delta, self.weights[i]) * getattr(self, self.activations[i-1] + '_prime')(layer_input)
+        self.optimizer.update(params, deltas, learning_rate)
+        self.weights_changed()
+
+    ############################################################################################################
+    def train_epoch(self, x, y, learning_rate, batch_size=1):
+        # x and y hold one item per row and must already be of the network's dtype, as train makes them; the items
+        # are shuffled and trained in batches of batch_size, so 1 gives online training and len(x) full batch
+        # training. returns the mean summed squared error of the epoch
+        if self.learning_rate_schedule is not None:
+            learning_rate = self.learning_rate_schedule.get_learning_rate(learning_rate, self.epochs_trained)
+        indexes = np.random.permutation(len(x))
+        epoch_cost_sum = 0
+        if self.preallocate:
+            for start in range(0, len(x), batch_size):
+                epoch_cost_sum += self.train_batch(x, y, indexes[start:start+batch_size], learning_rate)
+            self.epochs_trained += 1
+            return epoch_cost_sum / len(x)
+        for start in range(0, len(x), batch_size):
+            batch_indexes = indexes[start:start+batch_size]
+            layer_activations = self.forward(x[batch_indexes])
+            o_cost = self.calc_cost(y[batch_indexes], layer_activations[-1])
+            self.backpropogation(x[batch_indexes], layer_activations, o_cost, learning_rate)
+            epoch_cost_sum += (o_cost**2).sum()
+        self.epochs_trained += 1
+        return epoch_cost_sum / len(x)
+
+    ############################################################################################################
+    def train(self, x, y, num_epochs, learning_rate, batch_size=1, target_error=None, patience=None,
+              min_improvement=0.0, epoch_callback=None):
+        # trains for up to num_epochs, stopping early once an epoch error is at most target_error, or once patience
+        # epochs in a row have failed to beat the best error so far by more than min_improvement. epoch_callback,
+        # if given, is called with the epoch number and error after every epoch and stops training by returning
+        # True. returns the epoch errors, the epoch training stopped at and why: 'target', 'converged', 'callback'
+        # or 'epochs'. x and y are converted to the network's dtype once here rather than every epoch
+        x = np.asarray(x, dtype=self.dtype)
+        y = np.asarray(y, dtype=self.dtype)
+        epoch_errors = []
+        best_error = None
+        epochs_without_improvement = 0
+        stop_reason = 'epochs'
+        for i in range(num_epochs):
+            epoch_error = self.train_epoch(x, y, learning_rate, batch_size)
+            epoch_errors.append(epoch_error)
+            if epoch_callback is not None and epoch_callback(i + 1, epoch_error):
+                stop_reason = 'callback'
+                break
+            if target_error is not None and epoch_error <= target_error:
+                stop_reason = 'target'
+                break
+            if patience is not None:
+                if best_error is None or epoch_error < best_error - min_improvement:
+                    best_error = epoch_error
+                    epochs_without_improvement = 0
+                else:
+                    epochs_without_improvement += 1
+                    if epochs_without_improvement >= patience:
+                        stop_reason = 'converged'
+                        break
+        return {'epoch_errors': epoch_errors, 'stop_epoch': len(epoch_errors), 'stop_reason': stop_reason}
+
+    ############################################################################################################
+    def get_accuracy(self, x, y):
+        # fraction of items whose most active output unit is their label
+        o = self.forward(x)[-1]
+        return np.mean(o.argmax(1) == y.argmax(1))
+
+    ############################################################################################################
+    def get_weights(self):
+        return {'biases': [np.copy(bias) for bias in self.biases],
+                'weights': [np.copy(weight_matrix) for weight_matrix in self.weights],
+                'activations': list(self.activations)}
+
+    ############################################################################################################
+    def set_weights(self, weights):
+        self.biases = [np.array(bias, dtype=self.dtype) for bias in weights['biases']]
+        self.weights = [np.array(weight_matrix, dtype=self.dtype) for weight_matrix in weights['weights']]
+        self.activations = list(weights['activations'])
+        self.set_layer_sizes([len(bias) for bias in self.biases[:-1]])
+        self.buffers = {}
+        self.weights_changed()
+
+    # activations and their derivatives write into out when it is given. the derivatives take the activation a
+    # rather than the net input z, so tanh_prime(tanh(z)) is the derivative of tanh at z. the in-place versions do
+    # the same arithmetic as the plain ones
+    ############################################################################################################
+    @staticmethod
+    def tanh(z, out=None):
+        return np.tanh(z, out=out)
 
-        h_cost = np.dot(o_delta, self.o_h)
-        h_delta = h_cost * self.tanh_prime(h)
+    ############################################################################################################
+    @staticmethod
+    def tanh_prime(a, out=None):
+        if out is None:
+            return 1.0 - a**2
+        np.square(a, out=out)
+        return np.subtract(1.0, out, out=out)
 
-        self.o_bias += o_delta * learning_rate
-        self.o_h += (np.dot(o_delta.reshape(len(o_delta), 1), h.reshape(1, len(h))) * learning_rate)
+    ############################################################################################################
+    @staticmethod
+    def sigmoid(z, out=None):
+        if out is None:
+            return 1/(1+np.exp(-z))
+        np.negative(z, out=out)
+        np.exp(out, out=out)
+        out += 1
+        return np.reciprocal(out, out=out)
 
-        self.h_bias += h_delta * learning_rate
-        self.h_x += (np.dot(h_delta.reshape(len(h_delta), 1), x.reshape(1, len(x))) * learning_rate)
+    ############################################################################################################
+    @staticmethod
+    def sigmoid_prime(a, out=None):
+        if out is None:
+            return a * (1 - a)
+        np.subtract(1, a, out=out)
+        out *= a
+        return out
 
     ############################################################################################################
     @staticmethod
-    def tanh(z):
-        return np.tanh(z)
+    def relu(z, out=None):
+        return np.maximum(z, 0, out=out)
 
     ############################################################################################################
     @staticmethod
-    def tanh_prime(z):
-        return 1.0 - np.tanh(z)**2
+    def relu_prime(a, out=None):
+        if out is None:
+            return (a > 0).astype(a.dtype)
+        return np.greater(a, 0, out=out)
 
     ############################################################################################################
     @staticmethod
-    def sigmoid(z):
-        return 1/(1+np.exp(-z))
+    def linear(z, out=None):
+        if out is None:
+            return z
+        if out is not z:
+            out[...] = z
+        return out
 
     ############################################################################################################
     @staticmethod
-    def sigmoid_prime(z):
-        return 1/(1+np.exp(-z)) * (1 - 1/(1+np.exp(-z)))
+    def linear_prime(a, out=None):
+        if out is None:
+            return np.ones_like(a)
+        out.fill(1)
+        return out
+
+
+############################################################################################################
+############################################################################################################
+class TrainingWorker(threading.Thread):
+    # trains a private copy of the network in the background and puts snapshots of its weights and the errors of
+    # the epochs since the last snapshot on snapshot_queue, at most once every snapshot_interval seconds and
+    # once more when training ends. target_error, patience and min_improvement stop training early as in
+    # Network.train
+    def __init__(self, network, x, y, num_epochs, learning_rate, batch_size, snapshot_queue, snapshot_interval=0.05,
+                 target_error=None, patience=None, min_improvement=0.0):
+        threading.Thread.__init__(self, daemon=True)
+        self.network = copy.deepcopy(network)
+        self.x = x
+        self.y = y
+        self.num_epochs = num_epochs
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.snapshot_queue = snapshot_queue
+        self.snapshot_interval = snapshot_interval
+        self.target_error = target_error
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.stop_event = threading.Event()
+        self.epoch_error_list = []
+        self.last_snapshot_time = None
+
+    def run(self):
+        self.epoch_error_list = []
+        self.last_snapshot_time = time.time()
+        results = self.network.train(self.x, self.y, self.num_epochs, self.learning_rate, self.batch_size,
+                                     self.target_error, self.patience, self.min_improvement, self.end_epoch)
+        self.post_snapshot(self.epoch_error_list, True, results)
+
+    def end_epoch(self, epoch, epoch_error):
+        self.epoch_error_list.append(epoch_error)
+        if time.time() - self.last_snapshot_time >= self.snapshot_interval:
+            self.post_snapshot(self.epoch_error_list, False)
+            self.epoch_error_list = []
+            self.last_snapshot_time = time.time()
+        return self.stop_event.is_set()
+
+    def post_snapshot(self, epoch_error_list, done, results=None):
+        # the last snapshot also hands back the optimizer, whose state the next run carries on from, and the
+        # results of Network.train
+        snapshot = {'weights': self.network.get_weights(),
+                    'epoch_errors': epoch_error_list,
+                    'done': done}
+        if done:
+            snapshot['optimizer'] = self.network.optimizer
+            snapshot['epochs_trained'] = self.network.epochs_trained
+            snapshot['results'] = results
+        self.snapshot_queue.put(snapshot)
+
+    def stop(self):
+        self.stop_event.set()
 
 
 ############################################################################################################
 ############################################################################################################
 class Display:
-    def __init__(self, network, dataset):
+    def __init__(self, network, dataset, batch_size=1, learning_rate=0.10, target_error=None, patience=None,
+                 min_improvement=0.0):
 
         self.network = network
         self.dataset = dataset
@@ -85,20 +572,27 @@ class Display:
         self.current_input = np.copy(self.dataset.x[0])
         self.hidden_size = self.network.hidden_size
         self.num_epochs = 100
-        self.learning_rate = 0.10
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.target_error = target_error
+        self.patience = patience
+        self.min_improvement = min_improvement
         self.error_history = []
         self.current_epoch = 0
 
+        # training runs in a TrainingWorker thread, and the display shows its latest snapshot frame_interval ms apart
+        self.frame_interval = 50
+        self.training_worker = None
+        self.snapshot_queue = queue.Queue()
+        self.epochs_this_run = 0
+
         self.init_display()
         self.update_display()
 
     def init_display(self):
-        epoch_cost_sum = 0
-        for i in range(self.dataset.n):
-            h, o = self.network.feedforward(self.dataset.x[i])
-            o_cost = self.network.calc_cost(self.dataset.y[i], o)
-            epoch_cost_sum += (o_cost ** 2).sum()
-        epoch_error = epoch_cost_sum / self.dataset.n
+        h, o = self.network.feedforward(self.dataset.x)
+        o_cost = self.network.calc_cost(self.dataset.y, o)
+        epoch_error = (o_cost ** 2).sum() / self.dataset.n
         print()
         self.error_history.append(epoch_error)
 
@@ -188,8 +682,9 @@ class Display:
             size = 17
             spacing = 1
             weight_vector = np.copy(self.network.h_x[:, index])
+            colors = colormap.get_hex_colors(weight_vector)
             for i in range(len(weight_vector)):
-                color = self.get_hex_color(weight_vector[i])
+                color = colors[i]
                 x1 = startx
                 y1 = starty + (size + spacing) * i
                 self.weight_canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill=color)
@@ -202,13 +697,14 @@ class Display:
         elif self.selected_unit[0] == 'h':
             startx = 30
             starty = 70
-            size = 30
             spacing = 1
+            size = max(1, 155 // self.dataset.grid_size - spacing)
             weight_vector = np.copy(self.network.h_x[index, :])
-            weight_matrix = weight_vector.reshape((5, 5))
+            weight_matrix = weight_vector.reshape((self.dataset.grid_size, self.dataset.grid_size))
+            colors = colormap.get_hex_colors(weight_matrix)
             for i in range(weight_matrix.shape[0]):
                 for j in range(weight_matrix.shape[1]):
-                    color = self.get_hex_color(weight_matrix[i, j])
+                    color = colors[i, j]
 
                     x1 = startx + (size + spacing) * i
                     y1 = starty + (size + spacing) * j
@@ -226,8 +722,9 @@ class Display:
             size = 18
             spacing = 1
             weight_vector = np.copy(self.network.o_h[:, index])
+            colors = colormap.get_hex_colors(weight_vector)
             for i in range(weight_vector.shape[0]):
-                color = self.get_hex_color(weight_vector[i])
+                color = colors[i]
                 x1 = startx
                 y1 = starty + (size + spacing) * i
                 self.weight_canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill=color)
@@ -238,8 +735,9 @@ class Display:
             size = 18
             spacing = 1
             weight_vector = np.copy(self.network.o_h[index, :])
+            colors = colormap.get_hex_colors(weight_vector)
             for i in range(weight_vector.shape[0]):
-                color = self.get_hex_color(weight_vector[i])
+                color = colors[i]
                 x1 = startx
                 y1 = starty + (size + spacing) * i
                 self.weight_canvas.create_rectangle(x1, y1, x1 + size, y1 + size, fill=color)
@@ -253,8 +751,8 @@ class Display:
         size = 20
         spacing = 8
 
-        for i in range(10):
-            number = self.dataset.number_list[i]
+        for i in range(min(10, len(self.dataset.label_list))):
+            number = self.dataset.label_list[i]
             the_tag = "n" + str(number)
             y1 = starty+(size+spacing)*i
             self.network_canvas.create_rectangle(startx, y1, startx+size, y1+size, fill='grey', tags=the_tag)
@@ -263,12 +761,12 @@ class Display:
     def draw_input_layer(self):
         startx = 50
         starty = 45
-        size = 40
         spacing = 1
+        size = max(1, 205 // self.dataset.grid_size - spacing)
 
         unit_counter = 0
         input_vector = np.copy(self.current_input)
-        input_matrix = input_vector.reshape((5, 5))
+        input_matrix = input_vector.reshape((self.dataset.grid_size, self.dataset.grid_size))
         for i in range(input_matrix.shape[0]):
             for j in range(input_matrix.shape[1]):
                 the_tag = "i" + str(unit_counter)
@@ -294,12 +792,13 @@ class Display:
         size = 20
         spacing = 2
 
-        h, o = self.network.feedforward(self.current_input)
+        h, o = self.network.get_activations(self.current_input)
+        colors = colormap.get_hex_colors(h)
         self.network_canvas.create_text(400, 20, text="Hidden Layer", font="Arial 20 bold", fill='white')
         for i in range(self.hidden_size):
             the_tag = "h" + str(i+1)
             y1 = starty+(size+spacing)*i
-            fcolor = self.get_hex_color(h[i])
+            fcolor = colors[i]
             if self.selected_unit == the_tag:
                 bcolor = 'yellow'
             else:
@@ -310,16 +809,17 @@ class Display:
                 starty -= 10*(size+spacing)
 
     def draw_output_layer(self):
-        h, o = self.network.feedforward(self.current_input)
+        h, o = self.network.get_activations(self.current_input)
         self.network_canvas.create_text(620, 20, text="Output Layer", font="Arial 20 bold", fill='white')
         startx = 540
         starty = 40
         size = 22
         spacing = 2
         softmax = o / o.sum()
-        for i in range(10):
+        colors = colormap.get_hex_colors(o)
+        for i in range(self.network.output_size):
             the_tag = "o" + str(i+1)
-            fcolor = self.get_hex_color(o[i])
+            fcolor = colors[i]
             if self.selected_unit == the_tag:
                 bcolor = 'yellow'
             else:
@@ -355,6 +855,10 @@ class Display:
         self.reset_button.place(x=675, y=5)
 
     def train(self):
+        if self.training_worker is not None:
+            self.training_worker.stop()
+            return
+
         epoch_entry = self.epochs_entry.get()
         try:
             new_epochs = int(epoch_entry)
@@ -379,31 +883,58 @@ class Display:
             self.learning_rate_entry.delete(0, tk.END)
             self.learning_rate_entry.insert(0, self.learning_rate)
 
-        for i in range(self.num_epochs):
-            epoch_cost_sum = 0
-            indexes = list(range(10))
-            random.shuffle(indexes)
-
-            for j in range(self.dataset.n):
-                index = indexes[j]
-                h, o = self.network.feedforward(self.dataset.x[index])
-                o_cost = self.network.calc_cost(self.dataset.y[index], o)
-                self.network.backpropogation(self.dataset.x[index], o, h, o_cost, self.learning_rate)
-                epoch_cost_sum += (o_cost**2).sum()
-
-            epoch_error = epoch_cost_sum / self.dataset.n
-            self.current_epoch += 1
-            print("Epoch: {}     Error: {:0.3f}".format(self.current_epoch, epoch_error))
-            if i % 10 == 0:
-                self.error_history.append(epoch_error)
-                self.update_display()
-        self.update_display()
+        self.epochs_this_run = 0
+        self.training_worker = TrainingWorker(self.network, self.dataset.x, self.dataset.y, self.num_epochs,
+                                              self.learning_rate, self.batch_size, self.snapshot_queue,
+                                              target_error=self.target_error, patience=self.patience,
+                                              min_improvement=self.min_improvement)
+        self.training_worker.start()
+        self.train_button.config(text="Stop")
+        self.root.after(self.frame_interval, self.poll_training)
+
+    def poll_training(self):
+        # only the newest of the snapshots that arrived since the last frame is drawn
+        if self.training_worker is None:
+            return
+        latest_snapshot = None
+        while not self.snapshot_queue.empty():
+            latest_snapshot = self.snapshot_queue.get()
+            for epoch_error in latest_snapshot['epoch_errors']:
+                self.current_epoch += 1
+                print("Epoch: {}     Error: {:0.3f}".format(self.current_epoch, epoch_error))
+                if self.epochs_this_run % 10 == 0:
+                    self.error_history.append(epoch_error)
+                self.epochs_this_run += 1
+
+        if latest_snapshot is not None:
+            self.network.set_weights(latest_snapshot['weights'])
+            self.update_display()
+            if latest_snapshot['done']:
+                results = latest_snapshot['results']
+                if results['stop_reason'] in ('target', 'converged'):
+                    print("Stopped early at epoch {} ({})".format(results['stop_epoch'], results['stop_reason']))
+                self.network.optimizer = latest_snapshot['optimizer']
+                self.network.epochs_trained = latest_snapshot['epochs_trained']
+                self.training_worker = None
+                self.train_button.config(text="Train")
+                return
+        self.root.after(self.frame_interval, self.poll_training)
+
+    def stop_training(self):
+        # stops the worker and throws away whatever it had not yet shown
+        if self.training_worker is not None:
+            self.training_worker.stop()
+            self.training_worker.join()
+            self.training_worker = None
+            self.train_button.config(text="Train")
+        while not self.snapshot_queue.empty():
+            self.snapshot_queue.get()
 
     def network_click(self, event):
         the_tag = self.get_tags(event)
         if the_tag is not None:
             if the_tag[0] == 'n':
-                self.current_input = np.copy(self.dataset.x[int(the_tag[1])])
+                self.current_input = np.copy(self.dataset.x[self.dataset.number_index_dict[the_tag[1:]]])
                 self.update_display()
             else:
                 if the_tag == self.selected_unit:
@@ -445,6 +976,7 @@ class Display:
             self.hidden_size_entry.delete(0, tk.END)  # deletes the current value
             self.hidden_size_entry.insert(0, self.hidden_size)  # inserts new value assigned by 2nd parameter
 
+        self.stop_training()
         self.current_input = np.copy(self.dataset.x[0])
         self.error_history = []
         self.current_epoch = 0
@@ -466,75 +998,424 @@ class Display:
 
     @staticmethod
     def get_hex_color(value):
-        abs_value = 1 - abs(value)
-        scaled_value = int(round(255 * abs_value, 0))
-        if scaled_value < 0:
-            scaled_value = 0
-        if scaled_value > 255:
-            scaled_value = 255
-        hex_value = hex(scaled_value)[2:]
-
-        if len(hex_value) == 1:
-            hex_value = "0" + hex_value
-
-        if value > 0:
-            return '#{}ff{}'.format(hex_value, hex_value)
-        elif value < 0:
-            return '#ff{}{}'.format(hex_value, hex_value)
-        else:
-            return "#ffffff"
+        return colormap.get_hex_color(value)
 
 
 class Dataset:
-
-    def __init__(self, file_path):
+    # items are stored as contiguous arrays: x is [n, grid_size*grid_size] with one flattened grid per row and y is
+    # [n, num_labels] with a one-hot row per item. Text files have one item per line, "label, cell, cell, ...",
+    # where a cell is two digits "rc" or, for grids bigger than 10x10, "r:c". Lines starting with # are comments,
+    # except a "# grid_size N" line, which gives the grid size when it is not passed in; without either, the grid
+    # is as big as the largest coordinate in the file. MNIST-style IDX files are read by
+    # passing the image file as file_path and the label file as labels_path. Parsed files are cached next to the
+    # source as file_path + '.npz' and reloaded from there while the cache is newer than the source.
+
+    def __init__(self, file_path, labels_path=None, grid_size=None, use_cache=True):
         self.file_path = file_path
-        self.number_list = []
-        self.number_index_dict = {}
-        self.number_data_dict = {}
-        self.read_file()
-        self.x = []
-        self.y = []
-        self.n = 0
+        self.labels_path = labels_path
+        self.cache_path = file_path + '.npz'
+        self.grid_size = grid_size
+        self.labels = None
+        self.x = None
+        self.y = None
+
+        if use_cache and self.cache_is_current():
+            self.read_cache()
+        else:
+            if labels_path is None:
+                self.read_file()
+            else:
+                self.read_idx_files()
+            if use_cache:
+                self.write_cache()
         self.create_items()
 
     def read_file(self):
+        label_list = []
+        cell_lists = []
+        max_coordinate = 0
+        file_grid_size = None
         f = open(self.file_path)
-        line_counter = 0
         for line in f:
+            if line.startswith('#'):
+                words = line[1:].split()
+                if len(words) == 2 and words[0] == 'grid_size':
+                    file_grid_size = int(words[1])
+                continue
             data = (line.strip().strip('\n').strip()).split(',')
-            self.number_list.append(data[0])
-            self.number_index_dict[data[0]] = line_counter
-            self.number_data_dict[data[0]] = data[1:]
+            if len(data[0]) == 0:
+                continue
+            cell_list = []
+            for cell in data[1:]:
+                cell = cell.strip()
+                if ':' in cell:
+                    x1, x2 = cell.split(':')
+                else:
+                    x1, x2 = cell[0], cell[1]
+                cell_list.append((int(x1), int(x2)))
+                max_coordinate = max(max_coordinate, int(x1), int(x2))
+            label_list.append(int(data[0]))
+            cell_lists.append(cell_list)
         f.close()
 
+        if self.grid_size is None:
+            self.grid_size = file_grid_size
+        if self.grid_size is None:
+            self.grid_size = max_coordinate + 1
+        if max_coordinate >= self.grid_size:
+            raise ValueError("{} has cells outside a {}x{} grid".format(self.file_path, self.grid_size,
+                                                                         self.grid_size))
+        self.labels = np.array(label_list, int)
+        self.x = np.zeros([len(cell_lists), self.grid_size * self.grid_size], float)
+        for i in range(len(cell_lists)):
+            for x1, x2 in cell_lists[i]:
+                self.x[i, x1 * self.grid_size + x2] = 1
+
+    def read_idx_files(self):
+        # IDX headers are big-endian; the pixel and label bytes are mapped with np.memmap rather than read in
+        header = np.fromfile(self.file_path, '>u4', count=4)
+        if header[0] != 2051:
+            raise ValueError("{} is not an IDX image file".format(self.file_path))
+        num_images, num_rows, num_columns = int(header[1]), int(header[2]), int(header[3])
+        if num_rows != num_columns:
+            raise ValueError("Images must be square, not {}x{}".format(num_rows, num_columns))
+        images = np.memmap(self.file_path, np.uint8, 'r', offset=16, shape=(num_images, num_rows * num_columns))
+
+        header = np.fromfile(self.labels_path, '>u4', count=2)
+        if header[0] != 2049 or header[1] != num_images:
+            raise ValueError("{} is not an IDX label file for {}".format(self.labels_path, self.file_path))
+        labels = np.memmap(self.labels_path, np.uint8, 'r', offset=8, shape=(num_images,))
+
+        self.grid_size = num_rows
+        self.x = images / 255.0
+        self.labels = np.array(labels, int)
+
+    def cache_is_current(self):
+        if not os.path.exists(self.cache_path):
+            return False
+        source_time = os.path.getmtime(self.file_path)
+        if self.labels_path is not None:
+            source_time = max(source_time, os.path.getmtime(self.labels_path))
+        if os.path.getmtime(self.cache_path) < source_time:
+            return False
+        if self.grid_size is not None:
+            cache = np.load(self.cache_path)
+            return int(cache['grid_size']) == self.grid_size
+        return True
+
+    def read_cache(self):
+        cache = np.load(self.cache_path)
+        self.x = cache['x'] / float(cache['x_scale'])
+        self.labels = cache['labels']
+        self.grid_size = int(cache['grid_size'])
+
+    def write_cache(self):
+        # binary grids and 8 bit images are cached as bytes, 8 times smaller than floats, and scaled back on reading
+        x_scale = 1
+        if not np.array_equal(self.x, self.x.astype(bool)):
+            x_scale = 255
+        x = self.x * x_scale
+        if np.array_equal(x, np.round(x)) and x.min() >= 0 and x.max() <= 255:
+            x = x.astype(np.uint8)
+        else:
+            x = self.x
+            x_scale = 1
+        np.savez_compressed(self.cache_path, x=x, x_scale=x_scale, labels=self.labels, grid_size=self.grid_size)
+
     def create_items(self):
-        for number in self.number_list:
-            new_y = np.zeros([10], float)
-            new_y[int(number)] = 1
-            self.y.append(new_y)
-            new_x_matrix = np.zeros([5, 5], float)
-            number_data = self.number_data_dict[number]
-            for i in range(len(number_data)):
-                data = number_data[i].strip()
-                x1 = int(data[0])
-                x2 = int(data[1])
-                new_x_matrix[x1, x2] = 1
-            new_x_vector = new_x_matrix.flatten()
-            self.x.append(new_x_vector)
-            self.n += 1
+        self.n = len(self.labels)
+        self.x_size = self.grid_size * self.grid_size
+        self.y_size = int(self.labels.max()) + 1
+        self.y = np.zeros([self.n, self.y_size], float)
+        self.y[np.arange(self.n), self.labels] = 1
+
+        # number_list holds the label of each item and number_index_dict the index of the first item of each label
+        self.number_list = [str(label) for label in self.labels]
+        self.number_index_dict = {}
+        for i in range(self.n - 1, -1, -1):
+            self.number_index_dict[self.number_list[i]] = i
+        self.label_list = sorted(self.number_index_dict, key=int)
+
+
+def run_headless(network, dataset, num_epochs, learning_rate, batch_size=1, target_error=None, patience=None,
+                 min_improvement=0.0):
+    # trains without a display and adds the final error, accuracy and wall time to the results of Network.train
+    if num_epochs < 1:
+        raise ValueError("num_epochs must be at least 1, not {}".format(num_epochs))
+    start_time = time.time()
+    results = network.train(dataset.x, dataset.y, num_epochs, learning_rate, batch_size, target_error, patience,
+                            min_improvement)
+    results['seconds'] = time.time() - start_time
+    results['final_error'] = results['epoch_errors'][-1]
+    results['accuracy'] = network.get_accuracy(dataset.x, dataset.y)
+    return results
+
+
+def run_optimizer_benchmark(dataset, hidden_size, optimizer_names, learning_rate, schedule_name, schedule_epochs,
+                            batch_size, target_error, max_epochs, seed_list):
+    # trains a fresh network per optimizer and seed until its epoch error reaches target_error, and reports how many
+    # epochs and seconds that took. runs that never reach it count as max_epochs in the means
+    print("{:>10} {:>8} {:>8} {:>10} {:>10} {:>12}".format("optimizer", "rate", "schedule", "reached", "epochs",
+                                                           "seconds"))
+    for optimizer_name in optimizer_names:
+        if learning_rate is None:
+            optimizer_rate = DEFAULT_LEARNING_RATES[optimizer_name]
+        else:
+            optimizer_rate = learning_rate
+        epoch_list = []
+        seconds_list = []
+        num_reached = 0
+        for seed in seed_list:
+            np.random.seed(seed)
+            the_network = Network(dataset.x_size, hidden_size, dataset.y_size, OPTIMIZERS[optimizer_name](),
+                                  create_schedule(schedule_name, schedule_epochs))
+            results = run_headless(the_network, dataset, max_epochs, optimizer_rate, batch_size, target_error)
+            if results['stop_reason'] == 'target':
+                num_reached += 1
+            seconds_list.append(results['seconds'])
+            epoch_list.append(results['stop_epoch'])
+        print("{:>10} {:>8} {:>8} {:>10} {:>10.1f} {:>12.3f}".format(optimizer_name, optimizer_rate, schedule_name,
+                                                                      "{}/{}".format(num_reached, len(seed_list)),
+                                                                      np.mean(epoch_list), np.mean(seconds_list)))
+
+
+def run_step_benchmark(dataset, hidden_size, num_epochs, batch_size=1):
+    # per-item training time, and the peak memory allocated on top of the network during an epoch, for float64 and
+    # float32 networks with and without preallocated buffers. every network starts from the same weights, and one
+    # warm up epoch creates the buffers and optimizer state before anything is measured
+    print("{:>8} {:>12} {:>14} {:>16}".format("dtype", "preallocate", "usec/item", "peak temp bytes"))
+    for dtype, preallocate in [('float64', False), ('float64', True), ('float32', False), ('float32', True)]:
+        np.random.seed(0)
+        the_network = Network(dataset.x_size, hidden_size, dataset.y_size, dtype=dtype, preallocate=preallocate)
+        x = np.asarray(dataset.x, dtype=dtype)
+        y = np.asarray(dataset.y, dtype=dtype)
+        the_network.train_epoch(x, y, 0.1, batch_size)
+
+        tracemalloc.start()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        the_network.train_epoch(x, y, 0.1, batch_size)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        start_time = time.perf_counter()
+        for i in range(num_epochs):
+            the_network.train_epoch(x, y, 0.1, batch_size)
+        seconds = time.perf_counter() - start_time
+        print("{:>8} {:>12} {:>14.2f} {:>16}".format(dtype, str(preallocate),
+                                                     1e6 * seconds / (num_epochs * dataset.n),
+                                                     peak_memory - start_memory))
+
+
+# the dataset as seen from inside a sweep worker process
+sweep_worker_dataset = []
+
+SWEEP_CONFIG_FIELDS = ['hidden_size', 'learning_rate', 'weight_stdev', 'epochs', 'optimizer', 'schedule', 'batch_size',
+                       'target_error', 'patience', 'min_improvement', 'seed']
+# the type of each config field, for comparing configs with csv rows, where every value is a string and None is ''
+SWEEP_CONFIG_TYPES = {'hidden_size': int, 'learning_rate': float, 'weight_stdev': float, 'epochs': int,
+                      'optimizer': str, 'schedule': str, 'batch_size': int, 'target_error': float, 'patience': int,
+                      'min_improvement': float, 'seed': int}
+SWEEP_RESULT_FIELDS = ['stop_epoch', 'stop_reason', 'final_error', 'accuracy', 'seconds']
+
+
+def init_sweep_worker(dataset):
+    sweep_worker_dataset.append(dataset)
+
+
+def run_sweep_config(config):
+    # trains one network from its own seed, so a configuration gives the same results in any process or order
+    dataset = sweep_worker_dataset[0]
+    np.random.seed(config['seed'])
+    the_network = Network(dataset.x_size, config['hidden_size'], dataset.y_size, OPTIMIZERS[config['optimizer']](),
+                          create_schedule(config['schedule'], config['epochs']), config['weight_stdev'])
+    results = run_headless(the_network, dataset, config['epochs'], config['learning_rate'], config['batch_size'],
+                           config['target_error'], config['patience'], config['min_improvement'])
+    row = {}
+    for field in SWEEP_CONFIG_FIELDS:
+        row[field] = config[field]
+    for field in SWEEP_RESULT_FIELDS:
+        row[field] = results[field]
+    return row
+
+
+def create_sweep_configs(hidden_sizes, learning_rates, weight_stdevs, epochs_list, num_random, seed,
+                         optimizer_name='sgd', schedule_name='none', batch_size=1, target_error=None, patience=None,
+                         min_improvement=0.0):
+    # every combination of the values given, or with num_random, that many configurations with hidden size and
+    # epochs drawn from their lists and learning rate and weight stdev drawn log-uniformly between the smallest and
+    # largest values given. the training settings after seed are shared by every configuration. each configuration
+    # is trained from a seed derived from seed and its own values, so growing the grid leaves the others unchanged
+    value_list = []
+    if num_random is None:
+        value_list = list(itertools.product(hidden_sizes, learning_rates, weight_stdevs, epochs_list))
+    else:
+        random_state = np.random.RandomState(seed)
+        for i in range(num_random):
+            value_list.append((int(random_state.choice(hidden_sizes)),
+                               float(np.exp(random_state.uniform(np.log(min(learning_rates)),
+                                                                 np.log(max(learning_rates))))),
+                               float(np.exp(random_state.uniform(np.log(min(weight_stdevs)),
+                                                                 np.log(max(weight_stdevs))))),
+                               int(random_state.choice(epochs_list))))
+    config_list = []
+    for values in value_list:
+        config = dict(zip(SWEEP_CONFIG_FIELDS, values))
+        config.update({'optimizer': optimizer_name, 'schedule': schedule_name, 'batch_size': batch_size,
+                       'target_error': target_error, 'patience': patience, 'min_improvement': min_improvement,
+                       'seed': None})
+        config['seed'] = (seed + zlib.crc32(repr(get_sweep_config_key(config)).encode())) % 2**32
+        config_list.append(config)
+    return config_list
+
+
+def get_sweep_config_key(config):
+    key = []
+    for field in SWEEP_CONFIG_FIELDS:
+        value = config[field]
+        if value is None or value == '':
+            key.append(None)
+        else:
+            key.append(SWEEP_CONFIG_TYPES[field](value))
+    return tuple(key)
+
+
+def run_sweep(dataset, config_list, output_path, num_workers=1):
+    # trains every configuration across a process pool and appends each result row to the csv at output_path as
+    # soon as it arrives. configurations already in the file, e.g. from a sweep that was killed, are skipped
+    done_keys = set()
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        f = open(output_path, newline='')
+        reader = csv.DictReader(f)
+        if reader.fieldnames != SWEEP_CONFIG_FIELDS + SWEEP_RESULT_FIELDS:
+            f.close()
+            raise ValueError("{} was not written by this version of the sweep".format(output_path))
+        for row in reader:
+            done_keys.add(get_sweep_config_key(row))
+        f.close()
+        f = open(output_path, 'a', newline='')
+        writer = csv.DictWriter(f, SWEEP_CONFIG_FIELDS + SWEEP_RESULT_FIELDS)
+    else:
+        f = open(output_path, 'w', newline='')
+        writer = csv.DictWriter(f, SWEEP_CONFIG_FIELDS + SWEEP_RESULT_FIELDS)
+        writer.writeheader()
+
+    remaining_configs = []
+    for config in config_list:
+        if get_sweep_config_key(config) not in done_keys:
+            remaining_configs.append(config)
+    print("Sweep: {} configurations, {} already done".format(len(config_list),
+                                                             len(config_list) - len(remaining_configs)))
+
+    print("{:>8} {:>10} {:>10} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        "hidden", "rate", "stdev", "epochs", "seed", "stopped", "error", "accuracy", "seconds"))
+    pool = multiprocessing.Pool(num_workers, initializer=init_sweep_worker, initargs=(dataset,))
+    try:
+        for row in pool.imap_unordered(run_sweep_config, remaining_configs):
+            writer.writerow(row)
+            f.flush()
+            print("{:>8} {:>10.4g} {:>10.4g} {:>8} {:>10} {:>10} {:>10.4f} {:>10.3f} {:>10.3f}".format(
+                row['hidden_size'], row['learning_rate'], row['weight_stdev'], row['epochs'], row['seed'],
+                row['stop_epoch'], row['final_error'], row['accuracy'], row['seconds']))
+    finally:
+        pool.terminate()
+        pool.join()
+        f.close()
 
 
 def main():
-    hidden_size = 8
-
-    the_dataset = Dataset('digits_items.txt')
-
-    the_network = Network(25, hidden_size, 10)
+    parser = argparse.ArgumentParser(description="Digit recognition neural network")
+    parser.add_argument('--dataset', default='digits_items.txt', help="items file, or IDX images file")
+    parser.add_argument('--labels', default=None, help="IDX labels file to go with an IDX images file")
+    parser.add_argument('--grid-size', type=int, default=None,
+                        help="rows and columns of the items grid, if the items file has no grid_size line")
+    parser.add_argument('--hidden-size', type=int, nargs='+', default=[8],
+                        help="sizes of one or more hidden layers; the display shows networks with one")
+    parser.add_argument('--activations', nargs='+', default=None, choices=Network.activation_list,
+                        help="activation of each hidden layer and the output layer")
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--optimizer', default='sgd', choices=sorted(OPTIMIZERS))
+    parser.add_argument('--learning-rate', type=float, default=None,
+                        help="defaults to a rate suited to the optimizer")
+    parser.add_argument('--schedule', default='none', choices=SCHEDULES)
+    parser.add_argument('--schedule-epochs', type=int, default=100,
+                        help="epochs the step and cosine schedules are spread over")
+    parser.add_argument('--epochs', type=int, default=100, help="epochs a headless run trains for at most")
+    parser.add_argument('--target-error', type=float, default=None,
+                        help="stop training once the epoch error is at most this; the benchmark defaults it to 0.05")
+    parser.add_argument('--patience', type=int, default=None,
+                        help="stop training after this many epochs in a row without improvement")
+    parser.add_argument('--min-improvement', type=float, default=0.0,
+                        help="amount an epoch error must beat the best so far by to count as an improvement")
+    parser.add_argument('--headless', action='store_true', help="train without a window and report the results")
+    parser.add_argument('--benchmark', action='store_true', help="compare epochs to reach --target-error per optimizer")
+    parser.add_argument('--optimizers', nargs='+', default=sorted(OPTIMIZERS), choices=sorted(OPTIMIZERS))
+    parser.add_argument('--max-epochs', type=int, default=1000)
+    parser.add_argument('--dtype', default='float64', choices=['float64', 'float32'])
+    parser.add_argument('--preallocate', action='store_true',
+                        help="train through preallocated buffers updated in place")
+    parser.add_argument('--step-benchmark', action='store_true',
+                        help="compare per-item training time and memory across dtypes and preallocation")
+    parser.add_argument('--sweep', default=None, metavar='CSV',
+                        help="train every configuration of the sweep options headlessly and write the results here, "
+                             "resuming from any rows it already holds")
+    parser.add_argument('--hidden-sizes', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--learning-rates', type=float, nargs='+', default=[0.01, 0.1])
+    parser.add_argument('--weight-stdevs', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--epochs-list', type=int, nargs='+', default=[500])
+    parser.add_argument('--random-configs', type=int, default=None,
+                        help="sample this many configurations instead of the whole grid")
+    parser.add_argument('--seed', type=int, default=0, help="base seed the sweep configuration seeds are derived from")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2])
+    args = parser.parse_args()
+    if args.epochs < 1 or min(args.epochs_list) < 1:
+        parser.error("--epochs and --epochs-list need at least 1 epoch")
+
+    the_dataset = Dataset(args.dataset, args.labels, args.grid_size)
+
+    if args.sweep is not None:
+        config_list = create_sweep_configs(args.hidden_sizes, args.learning_rates, args.weight_stdevs,
+                                           args.epochs_list, args.random_configs, args.seed, args.optimizer,
+                                           args.schedule, args.batch_size, args.target_error, args.patience,
+                                           args.min_improvement)
+        run_sweep(the_dataset, config_list, args.sweep, args.workers)
+        return
+
+    if args.step_benchmark:
+        run_step_benchmark(the_dataset, args.hidden_size, args.epochs, args.batch_size)
+        return
+
+    if args.benchmark:
+        run_optimizer_benchmark(the_dataset, args.hidden_size, args.optimizers, args.learning_rate, args.schedule,
+                                args.schedule_epochs, args.batch_size, args.target_error or 0.05, args.max_epochs,
+                                args.seeds)
+        return
+
+    learning_rate = args.learning_rate
+    if learning_rate is None:
+        learning_rate = DEFAULT_LEARNING_RATES[args.optimizer]
+    if args.activations is not None and len(args.activations) != len(args.hidden_size) + 1:
+        parser.error("--activations needs one activation per hidden layer plus one for the output layer")
+    if not args.headless and len(args.hidden_size) != 1:
+        parser.error("the display shows networks with one hidden layer; use --headless for deeper networks")
+    the_network = Network(the_dataset.x_size, args.hidden_size, the_dataset.y_size, OPTIMIZERS[args.optimizer](),
+                          create_schedule(args.schedule, args.schedule_epochs), activations=args.activations,
+                          dtype=args.dtype, preallocate=args.preallocate)
     np.set_printoptions(suppress=True, precision=3)
 
-    the_display = Display(the_network, the_dataset)
+    if args.headless:
+        results = run_headless(the_network, the_dataset, args.epochs, learning_rate, args.batch_size,
+                               args.target_error, args.patience, args.min_improvement)
+        print("Epochs: {} ({})".format(results['stop_epoch'], results['stop_reason']))
+        print("Seconds: {:0.3f}".format(results['seconds']))
+        print("Final error: {:0.4f}".format(results['final_error']))
+        print("Accuracy: {:0.3f}".format(results['accuracy']))
+        return
+
+    the_display = Display(the_network, the_dataset, args.batch_size, learning_rate, args.target_error, args.patience,
+                          args.min_improvement)
     the_display.root.mainloop()
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -2,34 +2,448 @@ import numpy as np
 import sys
 import tkinter as tk
 import time
+import argparse
+import tracemalloc
+import os
+import struct
+import hashlib
+import multiprocessing
+from multiprocessing import shared_memory
+from itertools import islice
+
+
+# (row, column) offsets of the live cells of some seed patterns, for headless runs
+PATTERNS = {'glider': [(0, 1), (1, 2), (2, 0), (2, 1), (2, 2)],
+            'blinker': [(0, 0), (0, 1), (0, 2)],
+            'r-pentomino': [(0, 1), (0, 2), (1, 0), (1, 1), (2, 1)],
+            'acorn': [(0, 1), (1, 3), (2, 0), (2, 1), (2, 4), (2, 5), (2, 6)],
+            'diehard': [(0, 6), (1, 0), (1, 1), (2, 1), (2, 5), (2, 6), (2, 7)]}
+
+# Life-like rules in B/S notation, and Generations rules with a /C number of states
+RULES = {'life': 'B3/S23',
+         'highlife': 'B36/S23',
+         'seeds': 'B2/S',
+         'day & night': 'B3678/S34678',
+         'life without death': 'B3/S012345678',
+         "brian's brain": 'B2/S/C3',
+         'star wars': 'B2/S345/C4'}
+
+# board snapshots are a fixed size header followed by the raw board buffer, so they can be memory-mapped
+SNAPSHOT_MAGIC = b'LIFESNAP'
+SNAPSHOT_HEADER_SIZE = 64
+SNAPSHOT_EXTENSIONS = ['.snap', '.lifesnap']
+
+# the bitpacked engine steps the board in strips of at most this many rows, through scratch words allocated once
+BITPACKED_STRIP_ROWS = 256
+
+# fill_random draws about this many random numbers at a time
+FILL_STRIP_CELLS = 1 << 20
+
+# the number of set bits in each byte value, for numpy versions without np.bitwise_count
+BYTE_BIT_COUNTS = np.array([bin(byte).count('1') for byte in range(256)], np.uint8)
 
 
 class World:
 
-    def __init__(self, matrix_size):
+    engine_list = ['numpy', 'loop', 'sparse', 'bitpacked', 'hashlife']
+
+    def __init__(self, matrix_size, engine='numpy', tile_size=64, max_cache_size=1000000, max_nodes=4000000,
+                 num_workers=1, parallel_threshold=1000000, rule='B3/S23', history_size=1000):
         self.the_matrix = None
         self.new_matrix = None
         self.num_rows = matrix_size[0]
         self.num_columns = matrix_size[1]
 
+        if engine not in self.engine_list:
+            raise ValueError("Unknown engine {}, expected one of {}".format(engine, self.engine_list))
+        self.engine = engine
+
+        # the rule is compiled into rule_table, which gives the next state of a cell from its current state and
+        # its number of live (state 1) neighbors; in Generations rules a live cell that does not survive counts
+        # up through the dying states 2 to num_states-1 before it is dead again
+        self.birth, self.survival, self.num_states = parse_rule(rule)
+        self.rule = format_rule(self.birth, self.survival, self.num_states)
+        self.rule_table = self.compile_rule(self.birth, self.survival, self.num_states)
+        if self.num_states > 2 and engine in ['bitpacked', 'hashlife']:
+            raise ValueError("The {} engine only supports two state rules, not {}".format(engine, self.rule))
+        if 0 in self.birth and engine == 'hashlife':
+            raise ValueError("The hashlife engine cannot run B0 rules, where empty space comes to life")
+
+        # the sparse engine splits the interior of the board into tiles and only recomputes the active ones
+        self.tile_size = tile_size
+        self.num_tile_rows = max(0, -(-(self.num_rows-2) // tile_size))
+        self.num_tile_columns = max(0, -(-(self.num_columns-2) // tile_size))
+        self.active_tiles = None
+        self.tiles_evaluated = 0
+
+        # the sparse engine hashes each tile on its own and xors the tile hashes into board_hash, so each step only
+        # rehashes the tiles that changed; tile_hashes is None until the whole board has been hashed once
+        self.tile_hashes = None
+        self.board_hash = None
+
+        # the bitpacked engine stores each row as uint64 words holding one cell per bit, so the_matrix and
+        # new_matrix have shape [num_rows, num_words] and cells should be read and written through the accessors
+        self.num_words = -(-self.num_columns // 64)
+        self.interior_mask = None
+        self.strip_rows = None
+        self.shift_words = None
+        self.count_words = None
+
+        # the hashlife engine steps single generations like the numpy engine, but advance() jumps ahead through a
+        # memoized quadtree that is kept between calls so later jumps reuse earlier results
+        self.hashlife = None
+        if engine == 'hashlife':
+            self.hashlife = HashLife(max_cache_size, max_nodes, self.birth, self.survival)
+
+        # numpy boards with at least parallel_threshold cells are kept in shared memory and stepped in horizontal
+        # strips by a pool of num_workers processes; call close() when done with the world to release them
+        self.parallel_stepper = None
+        if engine == 'numpy' and num_workers > 1 and self.num_rows*self.num_columns >= parallel_threshold:
+            self.parallel_stepper = ParallelStepper(matrix_size, num_workers, self.rule_table)
+
+        # a hash of each of the last history_size generations is kept, mapped to the generation it was first seen
+        # at, so that a repeated board reveals a cycle; 0 turns this off. period and transient_length stay None
+        # until a cycle is found, and are cleared again whenever the board is changed from outside
+        self.history_size = history_size
+        self.history = {}
+        self.history_pending = False
+        self.generation = 0
+        self.period = None
+        self.transient_length = None
+
         self.init_matrix()
 
     def init_matrix(self):
-        self.the_matrix = np.zeros([self.num_rows, self.num_columns], int)
-        self.new_matrix = np.zeros([self.num_rows, self.num_columns], int)
+        # all cells start dead, including the border, which is never brought to life by next()
+        if self.engine == 'bitpacked':
+            self.the_matrix = np.zeros([self.num_rows, self.num_words], np.uint64)
+            self.new_matrix = np.zeros([self.num_rows, self.num_words], np.uint64)
+            interior_row = np.zeros([1, self.num_columns], int)
+            interior_row[0, 1:self.num_columns-1] = 1
+            self.interior_mask = self.pack_bits(interior_row)[0]
+            self.strip_rows = max(1, min(BITPACKED_STRIP_ROWS, self.num_rows-2))
+            self.shift_words = np.zeros([3, self.strip_rows+2, self.num_words], np.uint64)
+            self.count_words = np.zeros([8, self.strip_rows, self.num_words], np.uint64)
+        elif self.parallel_stepper is not None:
+            self.the_matrix = self.parallel_stepper.matrices[0]
+            self.new_matrix = self.parallel_stepper.matrices[1]
+            self.the_matrix[:] = 0
+            self.new_matrix[:] = 0
+        else:
+            self.the_matrix = np.zeros([self.num_rows, self.num_columns], int)
+            self.new_matrix = np.zeros([self.num_rows, self.num_columns], int)
+
+        self.generation = 0
+        self.mark_dirty()
+
+    @staticmethod
+    def compile_rule(birth, survival, num_states):
+        rule_table = np.zeros([num_states, 9], np.uint8)
+        for num_on_neighbors in range(9):
+            if num_on_neighbors in birth:
+                rule_table[0, num_on_neighbors] = 1
+            if num_on_neighbors in survival:
+                rule_table[1, num_on_neighbors] = 1
+            elif num_states > 2:
+                rule_table[1, num_on_neighbors] = 2
+        for state in range(2, num_states):
+            rule_table[state, :] = (state + 1) % num_states
+        return rule_table
 
-        for i in range(self.num_rows):
-            for j in range(self.num_columns):
-                if i == 0 or i == self.num_rows-1 or j == 0 or j == self.num_columns-1:
-                    self.the_matrix[i,j] = 0
+    def get_cell(self, i, j):
+        if self.engine == 'bitpacked':
+            return int((self.the_matrix[i, j // 64] >> np.uint64(j % 64)) & np.uint64(1))
+        return int(self.the_matrix[i, j])
+
+    def set_cell(self, i, j, value):
+        if self.engine == 'bitpacked':
+            bit = np.uint64(1) << np.uint64(j % 64)
+            if value:
+                self.the_matrix[i, j // 64] |= bit
+            else:
+                self.the_matrix[i, j // 64] &= ~bit
+        else:
+            self.the_matrix[i, j] = value
+        self.mark_dirty(i, j)
+
+    def get_board(self):
+        # returns the current generation as a [num_rows, num_columns] array of 0s and 1s; for the unpacked engines
+        # this is the_matrix itself rather than a copy, and for the bitpacked engine a uint8 copy
+        if self.engine == 'bitpacked':
+            return self.unpack_bits(self.the_matrix, self.num_columns)
+        return self.the_matrix
+
+    def set_board(self, board):
+        if self.engine == 'bitpacked':
+            self.the_matrix[:] = self.pack_bits(board)
+        else:
+            self.the_matrix[:] = board
+        self.mark_dirty()
+
+    def close(self):
+        # the board is copied out of shared memory first, so the world can still be used after closing
+        if self.parallel_stepper is not None:
+            self.the_matrix = np.copy(self.the_matrix)
+            self.new_matrix = np.copy(self.new_matrix)
+            self.parallel_stepper.close()
+            self.parallel_stepper = None
+
+    def get_memory_usage(self):
+        # bytes held by the two board buffers
+        return self.the_matrix.nbytes + self.new_matrix.nbytes
+
+    def get_population(self):
+        # the number of live (state 1) cells
+        if self.engine == 'bitpacked':
+            return count_set_bits(self.the_matrix)
+        return int(np.count_nonzero(self.the_matrix == 1))
+
+    def fill_random(self, density, seed=None):
+        # the random numbers are drawn a strip of rows at a time and written straight into the_matrix, so no
+        # board-sized temporaries are made; the border is left dead
+        rng = np.random.default_rng(seed)
+        strip_rows = max(1, FILL_STRIP_CELLS // self.num_columns)
+        for row_start in range(0, self.num_rows, strip_rows):
+            row_stop = min(row_start + strip_rows, self.num_rows)
+            rows = rng.random([row_stop - row_start, self.num_columns]) < density
+            rows[:, [0, -1]] = False
+            if self.engine == 'bitpacked':
+                self.the_matrix[row_start:row_stop] = self.pack_bits(rows)
+            else:
+                self.the_matrix[row_start:row_stop] = rows
+        self.the_matrix[[0, -1]] = 0
+        self.mark_dirty()
+
+    def place_pattern(self, cells, row=None, column=None):
+        # places a list of (row, column) offsets with its top left corner at (row, column), centered by default
+        height = max(cell[0] for cell in cells) + 1
+        width = max(cell[1] for cell in cells) + 1
+        if row is None:
+            row = (self.num_rows - height) // 2
+        if column is None:
+            column = (self.num_columns - width) // 2
+        for cell in cells:
+            self.set_cell(row + cell[0], column + cell[1], 1)
+
+    def place_block(self, block, row=None, column=None):
+        # copies a 2d array of cell states onto the board with its top left corner at (row, column), centered
+        # by default; the parts of the block that fall on or outside the border are dropped
+        if row is None:
+            row = (self.num_rows - block.shape[0]) // 2
+        if column is None:
+            column = (self.num_columns - block.shape[1]) // 2
+        r0 = max(row, 1)
+        r1 = min(row + block.shape[0], self.num_rows-1)
+        c0 = max(column, 1)
+        c1 = min(column + block.shape[1], self.num_columns-1)
+        if r1 <= r0 or c1 <= c0:
+            return
+        if self.engine == 'bitpacked':
+            board = self.get_board()
+        else:
+            board = self.the_matrix
+        board[r0:r1, c0:c1] = block[r0-row:r1-row, c0-column:c1-column]
+        if self.engine == 'bitpacked':
+            self.set_board(board)
+        self.mark_dirty()
+
+    def load_pattern(self, file_path, row=None, column=None):
+        # reads an RLE (.rle) or plaintext (.cells, .txt) pattern and places it on the board
+        if os.path.splitext(file_path)[1].lower() == '.rle':
+            block = read_rle(file_path)
+        else:
+            block = read_plaintext(file_path)
+        self.place_block(block, row, column)
+
+    def save_pattern(self, file_path):
+        # writes the smallest rectangle holding all live cells in RLE or plaintext format, chosen by extension
+        board = self.get_board()
+        live_rows, live_columns = np.nonzero(board)
+        if len(live_rows) > 0:
+            block = board[live_rows.min():live_rows.max()+1, live_columns.min():live_columns.max()+1]
+        else:
+            block = np.zeros([0, 0], int)
+        if os.path.splitext(file_path)[1].lower() == '.rle':
+            write_rle(file_path, block, self.rule, self.num_states)
+        else:
+            write_plaintext(file_path, block)
+
+    def save_snapshot(self, file_path):
+        # the snapshot is written to a temporary file first, so an interrupted checkpoint never replaces a good one
+        if self.engine == 'bitpacked':
+            storage = b'bitpacked'
+        else:
+            storage = b'dense'
+        board = np.ascontiguousarray(self.the_matrix)
+        header = SNAPSHOT_MAGIC + struct.pack('<QQ16s16s', self.num_rows, self.num_columns, storage,
+                                              board.dtype.str.encode())
+        temp_path = file_path + '.tmp'
+        f = open(temp_path, 'wb')
+        f.write(header.ljust(SNAPSHOT_HEADER_SIZE, b'\0'))
+        board.tofile(f)
+        f.close()
+        os.replace(temp_path, file_path)
+
+    def load_snapshot(self, file_path):
+        # a snapshot saved by a world with the same storage is memory-mapped copy-on-write, so loading does not
+        # read the board up front and stepping never writes back to the file
+        num_rows, num_columns, storage, dtype = read_snapshot_header(file_path)
+        if (num_rows, num_columns) != (self.num_rows, self.num_columns):
+            raise ValueError("Snapshot board is {}x{}, world board is {}x{}".format(num_rows, num_columns,
+                                                                                  self.num_rows, self.num_columns))
+        if storage == 'bitpacked':
+            shape = (num_rows, -(-num_columns // 64))
+        else:
+            shape = (num_rows, num_columns)
+        board = np.memmap(file_path, dtype, mode='c', offset=SNAPSHOT_HEADER_SIZE, shape=shape)
+
+        if (storage == 'bitpacked') != (self.engine == 'bitpacked'):
+            if storage == 'bitpacked':
+                board = self.unpack_bits(board, num_columns)
+            self.set_board(board)
+        elif self.parallel_stepper is not None:
+            self.the_matrix[:] = board
+            self.mark_dirty()
+        else:
+            self.the_matrix = board
+            self.new_matrix = np.zeros(shape, board.dtype)
+            self.mark_dirty()
+
+    @staticmethod
+    def pack_bits(board):
+        num_words = -(-board.shape[1] // 64)
+        padded_board = np.zeros([board.shape[0], num_words*64], np.uint8)
+        padded_board[:, :board.shape[1]] = board
+        return np.packbits(padded_board, axis=1, bitorder='little').view('<u8').astype(np.uint64)
+
+    @staticmethod
+    def unpack_bits(words, num_columns):
+        bytes_matrix = words.astype('<u8').view(np.uint8)
+        return np.unpackbits(bytes_matrix, axis=1, bitorder='little')[:, :num_columns]
+
+    def mark_dirty(self, i=None, j=None):
+        # tells the sparse engine that cell (i, j), or the whole board if no cell is given, was changed from outside,
+        # and starts the cycle history over from the changed board, which is hashed at the next step
+        self.history = {}
+        self.history_pending = True
+        self.tile_hashes = None
+        self.period = None
+        self.transient_length = None
+
+        if i is None or j is None:
+            self.active_tiles = np.ones([self.num_tile_rows, self.num_tile_columns], bool)
+        elif self.num_tile_rows > 0 and self.num_tile_columns > 0:
+            tile_row = min(max((i-1) // self.tile_size, 0), self.num_tile_rows-1)
+            tile_column = min(max((j-1) // self.tile_size, 0), self.num_tile_columns-1)
+            self.active_tiles[max(tile_row-1, 0):tile_row+2, max(tile_column-1, 0):tile_column+2] = True
 
     def onclick_init(self, i, j, original):
         if original == 0:
-            self.the_matrix[i, j] = 1
+            self.set_cell(i, j, 1)
         if original == 1:
-            self.the_matrix[i, j] = 0
+            self.set_cell(i, j, 0)
 
     def next(self):
+        if self.history_pending:
+            self.record_generation()
+        if self.engine == 'loop':
+            self.next_loop()
+        elif self.engine == 'sparse':
+            self.next_sparse()
+        elif self.engine == 'bitpacked':
+            self.next_bitpacked()
+        elif self.parallel_stepper is not None:
+            self.parallel_stepper.step(self.the_matrix is self.parallel_stepper.matrices[1])
+        else:
+            self.next_numpy()
+        tempor_matrix = self.the_matrix
+        self.the_matrix = self.new_matrix
+        self.new_matrix = tempor_matrix
+        self.generation += 1
+        self.record_generation()
+
+    def advance(self, num_generations):
+        # once a cycle has been found only the remainder of num_generations modulo the period is stepped
+        if self.period is not None:
+            num_skipped = num_generations - num_generations % self.period
+            num_generations -= num_skipped
+            self.generation += num_skipped
+            for key in self.history:
+                self.history[key] += num_skipped
+        if self.engine == 'hashlife':
+            self.advance_hashlife(num_generations)
+        else:
+            for i in range(num_generations):
+                self.next()
+
+    def record_generation(self):
+        self.history_pending = False
+        if self.history_size == 0:
+            return
+        if self.engine == 'sparse':
+            if self.tile_hashes is None:
+                self.hash_tiles()
+            board_hash = self.board_hash
+        elif self.engine == 'bitpacked':
+            board_hash = hashlib.blake2b(np.ascontiguousarray(self.the_matrix).data, digest_size=16).digest()
+        else:
+            board_hash = hashlib.blake2b(self.get_compact_cells(self.the_matrix).data, digest_size=16).digest()
+        if board_hash in self.history:
+            if self.period is None:
+                self.transient_length = self.history[board_hash]
+                self.period = self.generation - self.history[board_hash]
+            return
+        if len(self.history) >= self.history_size:
+            del self.history[next(iter(self.history))]
+        self.history[board_hash] = self.generation
+
+    def hash_tiles(self):
+        # the border is left out, since next() never changes it and the history starts over whenever it is changed
+        self.tile_hashes = {}
+        self.board_hash = 0
+        for tile_row in range(self.num_tile_rows):
+            for tile_column in range(self.num_tile_columns):
+                tile_hash = self.get_tile_hash(self.the_matrix, tile_row, tile_column)
+                self.tile_hashes[tile_row, tile_column] = tile_hash
+                self.board_hash ^= tile_hash
+
+    def get_tile_hash(self, board, tile_row, tile_column):
+        r0, r1, c0, c1 = self.get_tile_bounds(tile_row, tile_column)
+        tile_hash = hashlib.blake2b(struct.pack('<QQ', tile_row, tile_column), digest_size=16)
+        tile_hash.update(self.get_compact_cells(board[r0:r1, c0:c1]).data)
+        return int.from_bytes(tile_hash.digest(), 'little')
+
+    def get_compact_cells(self, cells):
+        # the unpacked boards hold an int64 per cell, so they are hashed through a copy with a byte per cell, or a bit
+        # per cell for two state rules
+        cells = cells.astype(np.uint8)
+        if self.num_states == 2:
+            return np.packbits(cells)
+        return cells
+
+    def get_tile_bounds(self, tile_row, tile_column):
+        r0 = 1 + tile_row*self.tile_size
+        r1 = min(r0 + self.tile_size, self.num_rows-1)
+        c0 = 1 + tile_column*self.tile_size
+        c1 = min(c0 + self.tile_size, self.num_columns-1)
+        return r0, r1, c0, c1
+
+    def advance_hashlife(self, num_generations):
+        # the quadtree universe is unbounded, so the jump is exact as long as the pattern stays clear of the border;
+        # anything that reaches the border or beyond is cut off when the result is copied back onto the board
+        if num_generations == 0:
+            return
+        root, origin = self.hashlife.from_board(self.get_board())
+        root, origin = self.hashlife.advance(root, origin, num_generations)
+        board = np.zeros([self.num_rows, self.num_columns], int)
+        self.hashlife.to_board(root, origin, board)
+        board[[0, -1], :] = 0
+        board[:, [0, -1]] = 0
+        generation = self.generation
+        self.set_board(board)
+        self.generation = generation + num_generations
+
+    def next_loop(self):
         for i in range(1, self.num_rows-1):
             for j in range(1, self.num_columns-1):
 
@@ -37,33 +451,394 @@ class World:
 
                 for m in range(-1, 2):
                     for n in range(-1, 2):
-                        num_on_neighbors += self.the_matrix[i + m, j + n]
+                        if self.the_matrix[i + m, j + n] == 1:
+                            num_on_neighbors += 1
 
                 if self.the_matrix[i, j] == 1:
                     num_on_neighbors -= 1
 
-                    if 2 <= num_on_neighbors <= 3:
-                        self.new_matrix[i, j] = 1
-                        changed = True
+                self.new_matrix[i, j] = self.rule_table[self.the_matrix[i, j], num_on_neighbors]
+
+    def next_numpy(self):
+        self.step_region(self.the_matrix, self.new_matrix, 1, self.num_rows-1, 1, self.num_columns-1, self.rule_table)
+
+    def next_sparse(self):
+        # a tile can only change if something in it or in a neighboring tile changed last generation, and every
+        # tile that is skipped already holds the same values in both buffers
+        changed_tiles = np.zeros([self.num_tile_rows, self.num_tile_columns], bool)
+        tile_rows, tile_columns = np.nonzero(self.active_tiles)
+        for tile_row, tile_column in zip(tile_rows, tile_columns):
+            r0, r1, c0, c1 = self.get_tile_bounds(tile_row, tile_column)
+            self.step_region(self.the_matrix, self.new_matrix, r0, r1, c0, c1, self.rule_table)
+            if (self.new_matrix[r0:r1, c0:c1] != self.the_matrix[r0:r1, c0:c1]).any():
+                changed_tiles[tile_row, tile_column] = True
+                if self.tile_hashes is not None:
+                    tile_hash = self.get_tile_hash(self.new_matrix, tile_row, tile_column)
+                    self.board_hash ^= self.tile_hashes[tile_row, tile_column] ^ tile_hash
+                    self.tile_hashes[tile_row, tile_column] = tile_hash
+        self.tiles_evaluated = len(tile_rows)
+
+        self.active_tiles = changed_tiles.copy()
+        self.active_tiles[1:, :] |= changed_tiles[:-1, :]
+        self.active_tiles[:-1, :] |= changed_tiles[1:, :]
+        changed_tiles = self.active_tiles.copy()
+        self.active_tiles[:, 1:] |= changed_tiles[:, :-1]
+        self.active_tiles[:, :-1] |= changed_tiles[:, 1:]
+
+    def next_bitpacked(self):
+        # the board is stepped in strips of strip_rows rows, so the scratch words stay a fixed size
+        for row_start in range(1, self.num_rows-1, self.strip_rows):
+            self.step_bitpacked_strip(row_start, min(row_start + self.strip_rows, self.num_rows-1))
+
+    def step_bitpacked_strip(self, row_start, row_stop):
+        one = np.uint64(1)
+        sixty_three = np.uint64(63)
+        num_strip_rows = row_stop - row_start
+        src = self.the_matrix[row_start-1:row_stop+1]
+        from_left, from_right, shifted = [words[:num_strip_rows+2] for words in self.shift_words]
+        s0, s1, s2, s3, carry, carry_1, born, survived = [words[:num_strip_rows] for words in self.count_words]
+
+        # from_left holds the cell to the left of each cell (column j-1) and from_right the cell to its right,
+        # with bits carried across word boundaries
+        np.left_shift(src, one, out=from_left)
+        np.right_shift(src[:, :-1], sixty_three, out=shifted[:, 1:])
+        from_left[:, 1:] |= shifted[:, 1:]
+        np.right_shift(src, one, out=from_right)
+        np.left_shift(src[:, 1:], sixty_three, out=shifted[:, :-1])
+        from_right[:, :-1] |= shifted[:, :-1]
+
+        # the eight neighbor bit planes are summed with a bitwise ripple adder into a four bit count (s0 to s3),
+        # updating the preallocated words in place; rules that only use counts below 4, like B3/S23, let s2 just
+        # flag counts of 4 or more and skip s3
+        full_count = max(self.birth + self.survival + (0,)) >= 4
+        for words in [s0, s1, s2, s3]:
+            words.fill(0)
+        for plane in [from_left[:-2], src[:-2], from_right[:-2],
+                      from_left[1:-1], from_right[1:-1],
+                      from_left[2:], src[2:], from_right[2:]]:
+            np.bitwise_and(s0, plane, out=carry)
+            s0 ^= plane
+            np.bitwise_and(s1, carry, out=carry_1)
+            s1 ^= carry
+            if full_count:
+                np.bitwise_and(s2, carry_1, out=carry)
+                s2 ^= carry_1
+                s3 |= carry
+            else:
+                s2 |= carry_1
+
+        # then the cells whose count is in the birth or survival set are picked out one count at a time, using the
+        # adder's carry words as scratch
+        if full_count:
+            count_bits = [s0, s1, s2, s3]
+        else:
+            count_bits = [s0, s1, s2]
+        has_count = carry
+        not_bit = carry_1
+        born.fill(0)
+        survived.fill(0)
+        for num_on_neighbors in range(9):
+            if num_on_neighbors in self.birth or num_on_neighbors in self.survival:
+                for bit in range(len(count_bits)):
+                    if (num_on_neighbors >> bit) & 1:
+                        bit_words = count_bits[bit]
                     else:
-                        self.new_matrix[i, j] = 0
-                else:
-                    if num_on_neighbors == 3:
-                        self.new_matrix[i, j] = 1
-                        changed = True
+                        np.invert(count_bits[bit], out=not_bit)
+                        bit_words = not_bit
+                    if bit == 0:
+                        np.copyto(has_count, bit_words)
                     else:
-                        self.new_matrix[i, j] = 0
-        tempor_matrix = self.the_matrix
-        self.the_matrix = self.new_matrix
-        self.new_matrix = tempor_matrix
+                        has_count &= bit_words
+                if num_on_neighbors in self.birth:
+                    born |= has_count
+                if num_on_neighbors in self.survival:
+                    survived |= has_count
+
+        # new cells are born where dead and survived where alive, and only the interior columns are written
+        alive = src[1:-1]
+        survived &= alive
+        np.invert(alive, out=not_bit)
+        born &= not_bit
+        born |= survived
+        born &= self.interior_mask
+        new_rows = self.new_matrix[row_start:row_stop]
+        np.bitwise_and(new_rows, ~self.interior_mask, out=not_bit)
+        born |= not_bit
+        new_rows[:] = born
+
+    @staticmethod
+    def step_region(src, dst, row_start, row_stop, column_start, column_stop, rule_table):
+        # computes rows [row_start, row_stop) and columns [column_start, column_stop) of the next generation,
+        # reading the one cell wide ring around the region from src, so the region must not include the border
+        r0, r1, c0, c1 = row_start, row_stop, column_start, column_stop
+        on = (src[r0-1:r1+1, c0-1:c1+1] == 1).view(np.uint8)
+        num_on_neighbors = (on[:-2, :-2] + on[:-2, 1:-1] + on[:-2, 2:] +
+                            on[1:-1, :-2] + on[1:-1, 2:] +
+                            on[2:, :-2] + on[2:, 1:-1] + on[2:, 2:])
+        dst[r0:r1, c0:c1] = rule_table[src[r0:r1, c0:c1], num_on_neighbors]
+
+
+# the shared board buffers as seen from inside a ParallelStepper worker process
+strip_worker_buffers = []
+strip_worker_matrices = []
+strip_worker_rule_table = []
+
+
+def init_strip_worker(buffer_names, matrix_size, rule_table):
+    strip_worker_rule_table.append(rule_table)
+    for buffer_name in buffer_names:
+        shared_buffer = shared_memory.SharedMemory(name=buffer_name)
+        strip_worker_buffers.append(shared_buffer)
+        strip_worker_matrices.append(np.ndarray(matrix_size, int, buffer=shared_buffer.buf))
+
+
+def step_strip(src_index, row_start, row_stop):
+    # the halo rows above and below the strip belong to the neighboring strips, and are read straight out of the
+    # shared source buffer, which no worker writes to during this generation
+    src = strip_worker_matrices[src_index]
+    dst = strip_worker_matrices[1 - src_index]
+    World.step_region(src, dst, row_start, row_stop, 1, src.shape[1]-1, strip_worker_rule_table[0])
+
+
+class ParallelStepper:
+
+    def __init__(self, matrix_size, num_workers, rule_table):
+        self.num_workers = num_workers
+        num_bytes = max(1, matrix_size[0] * matrix_size[1] * np.dtype(int).itemsize)
+        self.shared_buffers = [shared_memory.SharedMemory(create=True, size=num_bytes) for i in range(2)]
+        self.matrices = [np.ndarray(matrix_size, int, buffer=shared_buffer.buf)
+                         for shared_buffer in self.shared_buffers]
+
+        # the interior rows are split into one strip per worker
+        row_bounds = np.linspace(1, max(matrix_size[0]-1, 1), num_workers+1).round().astype(int)
+        self.strip_list = [(int(row_bounds[i]), int(row_bounds[i+1])) for i in range(num_workers)
+                           if row_bounds[i+1] > row_bounds[i]]
+
+        buffer_names = [shared_buffer.name for shared_buffer in self.shared_buffers]
+        self.pool = multiprocessing.Pool(num_workers, initializer=init_strip_worker,
+                                         initargs=(buffer_names, matrix_size, rule_table))
+
+    def step(self, src_index):
+        # returns once every strip of the next generation has been written, which is the barrier between
+        # generations
+        self.pool.starmap(step_strip, [(int(src_index), strip[0], strip[1]) for strip in self.strip_list])
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.matrices = []
+        for shared_buffer in self.shared_buffers:
+            shared_buffer.close()
+            shared_buffer.unlink()
+
+
+class Node:
+    # a canonical quadtree node of level k, covering 2**k x 2**k cells, with quadrants a (top left), b (top right),
+    # c (bottom left) and d (bottom right) and population n; level 0 nodes are single cells
+
+    __slots__ = ['k', 'a', 'b', 'c', 'd', 'n']
+
+    def __init__(self, k, a, b, c, d, n):
+        self.k = k
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        self.n = n
+
+
+class HashLife:
+
+    def __init__(self, max_cache_size=1000000, max_nodes=4000000, birth=(3,), survival=(2, 3)):
+        self.max_cache_size = max_cache_size
+        self.max_nodes = max_nodes
+        self.birth = birth
+        self.survival = survival
+
+        self.off = Node(0, None, None, None, None, 0)
+        self.on = Node(0, None, None, None, None, 1)
+        self.nodes = {}
+        self.zero_nodes = [self.off]
+        self.results = {}
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+    def join(self, a, b, c, d):
+        key = (a, b, c, d)
+        node = self.nodes.get(key)
+        if node is None:
+            self.collect()
+            node = Node(a.k+1, a, b, c, d, a.n + b.n + c.n + d.n)
+            self.nodes[key] = node
+        return node
+
+    def get_zero(self, k):
+        while len(self.zero_nodes) <= k:
+            z = self.zero_nodes[-1]
+            self.zero_nodes.append(self.join(z, z, z, z))
+        return self.zero_nodes[k]
+
+    def centre(self, m):
+        # returns the node one level up with m in its middle
+        z = self.get_zero(m.k-1)
+        return self.join(self.join(z, z, z, m.a), self.join(z, z, m.b, z),
+                         self.join(z, m.c, z, z), self.join(m.d, z, z, z))
+
+    @staticmethod
+    def is_padded(m):
+        # true when all live cells lie in the middle quarter (by width) of m
+        return m.a.n == m.a.d.d.n and m.b.n == m.b.c.c.n and m.c.n == m.c.b.b.n and m.d.n == m.d.a.a.n
+
+    def life_4x4(self, m):
+        cells = [[m.a.a.n, m.a.b.n, m.b.a.n, m.b.b.n],
+                 [m.a.c.n, m.a.d.n, m.b.c.n, m.b.d.n],
+                 [m.c.a.n, m.c.b.n, m.d.a.n, m.d.b.n],
+                 [m.c.c.n, m.c.d.n, m.d.c.n, m.d.d.n]]
+        new_cells = []
+        for i in range(1, 3):
+            for j in range(1, 3):
+                num_on_neighbors = -cells[i][j]
+                for m_offset in range(-1, 2):
+                    for n_offset in range(-1, 2):
+                        num_on_neighbors += cells[i + m_offset][j + n_offset]
+                if cells[i][j] == 1 and num_on_neighbors in self.survival:
+                    new_cells.append(self.on)
+                elif cells[i][j] == 0 and num_on_neighbors in self.birth:
+                    new_cells.append(self.on)
+                else:
+                    new_cells.append(self.off)
+        return self.join(*new_cells)
+
+    def successor(self, m, j):
+        # returns the centre half of m (one level down) advanced 2**j generations, where j <= m.k - 2
+        if m.n == 0:
+            return m.a
+        key = (m, j)
+        result = self.results.get(key)
+        if result is not None:
+            self.cache_hits += 1
+            return result
+        self.cache_misses += 1
+
+        if m.k == 2:
+            result = self.life_4x4(m)
+        else:
+            c1 = self.successor(m.a, j)
+            c2 = self.successor(self.join(m.a.b, m.b.a, m.a.d, m.b.c), j)
+            c3 = self.successor(m.b, j)
+            c4 = self.successor(self.join(m.a.c, m.a.d, m.c.a, m.c.b), j)
+            c5 = self.successor(self.join(m.a.d, m.b.c, m.c.b, m.d.a), j)
+            c6 = self.successor(self.join(m.b.c, m.b.d, m.d.a, m.d.b), j)
+            c7 = self.successor(m.c, j)
+            c8 = self.successor(self.join(m.c.b, m.d.a, m.c.d, m.d.c), j)
+            c9 = self.successor(m.d, j)
+            if j < m.k - 2:
+                # the nine overlapping sub-results are already 2**j generations on, so only their centres are kept
+                result = self.join(self.join(c1.d, c2.c, c4.b, c5.a), self.join(c2.d, c3.c, c5.b, c6.a),
+                                   self.join(c4.d, c5.c, c7.b, c8.a), self.join(c5.d, c6.c, c8.b, c9.a))
+            else:
+                # the sub-results are 2**(j-1) generations on, so a second round of steps finishes the jump
+                result = self.join(self.successor(self.join(c1, c2, c4, c5), j),
+                                   self.successor(self.join(c2, c3, c5, c6), j),
+                                   self.successor(self.join(c4, c5, c7, c8), j),
+                                   self.successor(self.join(c5, c6, c8, c9), j))
+
+        if len(self.results) >= self.max_cache_size:
+            self.evict_results()
+        self.results[key] = result
+        return result
+
+    def evict_results(self):
+        # drops the oldest half of the memo table
+        num_evicted = len(self.results) // 2 + 1
+        for key in list(islice(self.results, num_evicted)):
+            del self.results[key]
+        self.cache_evictions += num_evicted
+
+    def collect(self):
+        # starts a fresh node table when it is full, so it never holds more than max_nodes nodes. this can happen in
+        # the middle of a successor call: nodes already built stay valid but are no longer shared with nodes built
+        # afterwards, so the memo table is cleared with it. the empty nodes in zero_nodes are kept, since get_zero
+        # may be partway through extending them. a max_nodes too small for the pattern makes jumps slow, as every
+        # reset throws away the results they would have reused
+        if len(self.nodes) >= self.max_nodes:
+            self.cache_evictions += len(self.results)
+            self.nodes = {}
+            self.results = {}
+
+    def advance(self, root, origin, num_generations):
+        # steps root forward num_generations using one successor call per set bit of num_generations;
+        # origin is the (row, column) position of the top left cell of root and is returned updated
+        j = 0
+        while num_generations > 0:
+            if num_generations & 1:
+                while root.k < j + 3 or not self.is_padded(root):
+                    origin = (origin[0] - (1 << (root.k-1)), origin[1] - (1 << (root.k-1)))
+                    root = self.centre(root)
+                origin = (origin[0] + (1 << (root.k-2)), origin[1] + (1 << (root.k-2)))
+                root = self.successor(root, j)
+            num_generations >>= 1
+            j += 1
+        return root, origin
+
+    def from_board(self, board):
+        k = 2
+        while (1 << k) < max(board.shape):
+            k += 1
+        return self.build(board, k, 0, 0), (0, 0)
+
+    def build(self, board, k, row, column):
+        size = 1 << k
+        if not board[row:row+size, column:column+size].any():
+            return self.get_zero(k)
+        if k == 0:
+            return self.on
+        half = size >> 1
+        return self.join(self.build(board, k-1, row, column), self.build(board, k-1, row, column+half),
+                         self.build(board, k-1, row+half, column), self.build(board, k-1, row+half, column+half))
+
+    def to_board(self, m, origin, board):
+        # writes the live cells of m that fall inside board, with m's top left cell at origin
+        row, column = origin
+        size = 1 << m.k
+        if m.n == 0 or row >= board.shape[0] or column >= board.shape[1] or row + size <= 0 or column + size <= 0:
+            return
+        if m.k == 0:
+            board[row, column] = 1
+            return
+        half = size >> 1
+        self.to_board(m.a, (row, column), board)
+        self.to_board(m.b, (row, column+half), board)
+        self.to_board(m.c, (row+half, column), board)
+        self.to_board(m.d, (row+half, column+half), board)
+
+    def get_stats(self):
+        num_lookups = self.cache_hits + self.cache_misses
+        if num_lookups > 0:
+            hit_rate = self.cache_hits / num_lookups
+        else:
+            hit_rate = 0.0
+        return {'node_count': len(self.nodes),
+                'cache_size': len(self.results),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'cache_evictions': self.cache_evictions,
+                'hit_rate': hit_rate}
 
 
 class Window:
 
-    def __init__(self, the_world, square_size):
+    def __init__(self, the_world, square_size, frame_delay=0.1, stop_on_cycle=True):
 
         self.the_world = the_world
         self.square_size = square_size
+        self.frame_delay = frame_delay
+        self.stop_on_cycle = stop_on_cycle
+        self.frame_time = 0.0
+        self.cell_ids = None
+        self.drawn_board = None
 
         self.root = tk.Tk()
         self.root.title("Conway's Game of Life")
@@ -90,18 +865,21 @@ class Window:
         self.next_button.pack(side=tk.LEFT)
         self.reset_button.pack(side=tk.LEFT)
         self.quit_button.pack(side=tk.LEFT)
+        self.fps_label = tk.Label(self.button_frame, text="", fg="black", width=24)
+        self.fps_label.pack(side=tk.LEFT)
 
         self.running = False
 
         self.init_window()
 
     def init_window(self):
-        self.draw_world()
+        self.create_world()
 
     def next(self):
+        frame_start = time.time()
         self.the_world.next()
-        self.destroy_world()
         self.draw_world()
+        self.frame_time = time.time() - frame_start
 
     def start(self):
         if self.running:
@@ -111,14 +889,29 @@ class Window:
             self.running = True
             self.start_button.config(text="Pause")
 
+        num_frames = 0
+        last_report = time.time()
         while self.running:
             self.next()
             self.root.update()
-            time.sleep(0.1)
+            num_frames += 1
+            if time.time() - last_report >= 1.0:
+                self.update_fps(num_frames / (time.time() - last_report))
+                num_frames = 0
+                last_report = time.time()
+            if self.stop_on_cycle and self.the_world.period is not None:
+                self.running = False
+                self.start_button.config(text="Start")
+                self.fps_label.config(text="period {} after {} generations".format(self.the_world.period,
+                                                                                    self.the_world.transient_length))
+            time.sleep(self.frame_delay)
+
+    def update_fps(self, fps):
+        # frame time counts the step and the canvas update only, not the frame_delay pause between frames
+        self.fps_label.config(text="{:0.1f} fps ({:0.1f} ms/frame)".format(fps, 1000*self.frame_time))
 
     def reset(self):
         self.the_world.init_matrix()
-        self.destroy_world()
         self.draw_world()
 
     def onclick(self, event):
@@ -126,46 +919,430 @@ class Window:
         i = int(x / self.square_size)
         j = int(y / self.square_size)
 
-        if self.the_world.the_matrix[i,j] == 0:
+        if self.the_world.get_cell(i, j) == 0:
             original = 0
             color = "yellow"
-            self.canvas.create_rectangle(i * self.square_size, j * self.square_size, (i + 1) * self.square_size, (j + 1) * self.square_size, fill=color)
+            self.canvas.itemconfig(self.cell_ids[i, j], fill=color)
             self.the_world.onclick_init(i, j, original)
         else:
             original = 1
             color = "grey"
-            self.canvas.create_rectangle(i * self.square_size, j * self.square_size, (i + 1) * self.square_size, (j + 1) * self.square_size, fill=color)
+            self.canvas.itemconfig(self.cell_ids[i, j], fill=color)
             self.the_world.onclick_init(i, j, original)
+        self.drawn_board[i, j] = 1 - original
 
-    def destroy_world(self):
-        self.canvas.delete("all")
+    @staticmethod
+    def get_cell_color(state):
+        if state == 0:
+            return "grey"
+        elif state == 1:
+            return "yellow"
+        else:
+            return "orange"
 
-    def draw_world(self):
+    def create_world(self):
+        # the squares are created once and kept in cell_ids; later frames only recolor the cells that changed
+        self.cell_ids = np.zeros([self.the_world.num_rows, self.the_world.num_columns], int)
+        self.drawn_board = np.copy(self.the_world.get_board())
         for i in range(self.the_world.num_rows):
             for j in range(self.the_world.num_columns):
 
                 if i == 0 or i == self.the_world.num_rows - 1 or j == 0 or j == self.the_world.num_columns - 1:
                     color = 'black'
                 else:
-                    if self.the_world.new_matrix[i,j] == 0:
-                        color = "grey"
-                    else:
-                        color = "yellow"
+                    color = self.get_cell_color(self.drawn_board[i, j])
                 square = self.canvas.create_rectangle(i * self.square_size, j * self.square_size, (i + 1) * self.square_size, (j + 1) * self.square_size, fill=color)
-                j += 1
+                self.cell_ids[i, j] = square
 
-            i += 1
+    def draw_world(self):
+        board = self.the_world.get_board()
+        changed = board != self.drawn_board
+        changed[[0, -1], :] = False
+        changed[:, [0, -1]] = False
+        for i, j in zip(*np.nonzero(changed)):
+            color = self.get_cell_color(board[i, j])
+            self.canvas.itemconfig(self.cell_ids[i, j], fill=color)
+        self.drawn_board[:] = board
 
     def quit(self):
+        self.the_world.close()
         sys.exit()
 
 
+def parse_rule(rule):
+    # accepts a name from RULES, B/S notation with an optional /C number of states ("B36/S23", "B2/S/C3"), or the
+    # older S/B and S/B/C number notation ("23/3", "/2/3"); returns the birth and survival counts and the states
+    rule = RULES.get(rule.strip().lower(), rule).strip().upper()
+    part_list = rule.split('/')
+    birth = None
+    survival = None
+    num_states = 2
+    try:
+        if any(part[:1] in ['B', 'S', 'C', 'G'] for part in part_list):
+            for part in part_list:
+                if part[:1] == 'B':
+                    birth = tuple(sorted(set(int(char) for char in part[1:])))
+                elif part[:1] == 'S':
+                    survival = tuple(sorted(set(int(char) for char in part[1:])))
+                elif part[:1] in ['C', 'G']:
+                    num_states = int(part[1:])
+                elif part.isdigit():
+                    num_states = int(part)
+                else:
+                    raise ValueError
+        elif len(part_list) in [2, 3]:
+            survival = tuple(sorted(set(int(char) for char in part_list[0])))
+            birth = tuple(sorted(set(int(char) for char in part_list[1])))
+            if len(part_list) == 3:
+                num_states = int(part_list[2])
+    except ValueError:
+        birth = None
+    if birth is None or survival is None or num_states < 2 or any(n > 8 for n in birth + survival):
+        raise ValueError("Could not parse rule {}".format(rule))
+    return birth, survival, num_states
+
+
+def format_rule(birth, survival, num_states):
+    rule = "B{}/S{}".format(''.join(str(n) for n in birth), ''.join(str(n) for n in survival))
+    if num_states > 2:
+        rule += "/C{}".format(num_states)
+    return rule
+
+
+def read_rle(file_path):
+    # returns the pattern as a [y, x] array of cell states, where b and . are dead, o is live and A to X are the
+    # states 1 to 24 of multi-state rules; '#' comment lines and the rule in the header are ignored
+    width = 0
+    height = 0
+    data = ''
+    f = open(file_path)
+    for line in f:
+        line = line.strip()
+        if len(line) == 0 or line[0] == '#':
+            continue
+        if line[0] == 'x' and width == 0 and len(data) == 0:
+            for field in line.split(','):
+                name, value = field.split('=')
+                if name.strip() == 'x':
+                    width = int(value)
+                elif name.strip() == 'y':
+                    height = int(value)
+        else:
+            data += line
+            if '!' in line:
+                break
+    f.close()
+
+    cell_list = []
+    row = 0
+    column = 0
+    run_count = ''
+    for char in data:
+        if char.isdigit():
+            run_count += char
+            continue
+        if run_count == '':
+            count = 1
+        else:
+            count = int(run_count)
+        run_count = ''
+        if char == '!':
+            break
+        elif char == '$':
+            row += count
+            column = 0
+        elif char in 'b.':
+            column += count
+        else:
+            if 'A' <= char <= 'X':
+                state = ord(char) - ord('A') + 1
+            else:
+                state = 1
+            for i in range(count):
+                cell_list.append((row, column, state))
+                column += 1
+
+    for cell in cell_list:
+        height = max(height, cell[0] + 1)
+        width = max(width, cell[1] + 1)
+    block = np.zeros([height, width], int)
+    for cell in cell_list:
+        block[cell[0], cell[1]] = cell[2]
+    return block
+
+
+def write_rle(file_path, block, rule='B3/S23', num_states=2):
+    # dead cells at the end of a row and empty rows at the end of the pattern are left out, as the format allows;
+    # two state patterns use b and o, multi-state ones . and A to X
+    if num_states > 2:
+        state_chars = '.' + ''.join(chr(ord('A') + state - 1) for state in range(1, num_states))
+    else:
+        state_chars = 'bo'
+    token_list = []
+    for i in range(block.shape[0]):
+        if i > 0:
+            token_list.append([1, '$'])
+        j = 0
+        while j < block.shape[1]:
+            k = j
+            while k < block.shape[1] and block[i, k] == block[i, j]:
+                k += 1
+            token_list.append([k - j, state_chars[block[i, j]]])
+            j = k
+        if len(token_list) > 0 and token_list[-1][1] == state_chars[0]:
+            token_list.pop()
+
+    run_list = []
+    for token in token_list:
+        if len(run_list) > 0 and run_list[-1][1] == token[1]:
+            run_list[-1][0] += token[0]
+        else:
+            run_list.append(token)
+    while len(run_list) > 0 and run_list[-1][1] == '$':
+        run_list.pop()
+    run_list.append([1, '!'])
+
+    f = open(file_path, 'w')
+    f.write("x = {}, y = {}, rule = {}\n".format(block.shape[1], block.shape[0], rule))
+    line = ''
+    for count, char in run_list:
+        if count > 1:
+            run = str(count) + char
+        else:
+            run = char
+        if len(line) + len(run) > 70:
+            f.write(line + "\n")
+            line = ''
+        line += run
+    f.write(line + "\n")
+    f.close()
+
+
+def read_plaintext(file_path):
+    # '!' lines are comments, 'O' or '*' is a live cell and any other character a dead one; only two state
+    # patterns can be stored this way
+    row_list = []
+    f = open(file_path)
+    for line in f:
+        line = line.rstrip('\n')
+        if line.startswith('!'):
+            continue
+        row_list.append([1 if char in 'O*' else 0 for char in line.strip()])
+    f.close()
+    width = max([len(row) for row in row_list] + [0])
+    block = np.zeros([len(row_list), width], int)
+    for i in range(len(row_list)):
+        block[i, :len(row_list[i])] = row_list[i]
+    return block
+
+
+def write_plaintext(file_path, block):
+    f = open(file_path, 'w')
+    f.write("!Name: {}\n".format(os.path.splitext(os.path.basename(file_path))[0]))
+    for i in range(block.shape[0]):
+        f.write(''.join(['O' if cell == 1 else '.' for cell in block[i]]) + "\n")
+    f.close()
+
+
+def read_snapshot_header(file_path):
+    f = open(file_path, 'rb')
+    header = f.read(SNAPSHOT_HEADER_SIZE)
+    f.close()
+    if header[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("{} is not a board snapshot".format(file_path))
+    num_rows, num_columns, storage, dtype = struct.unpack_from('<QQ16s16s', header, len(SNAPSHOT_MAGIC))
+    return num_rows, num_columns, storage.rstrip(b'\0').decode(), np.dtype(dtype.rstrip(b'\0').decode())
+
+
+def is_snapshot_path(file_path):
+    return os.path.splitext(file_path)[1].lower() in SNAPSHOT_EXTENSIONS
+
+
+def count_set_bits(words):
+    # popcounts an array of uint64 words without unpacking it into one byte per bit
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(BYTE_BIT_COUNTS[np.ascontiguousarray(words).view(np.uint8)].sum(dtype=np.int64))
+
+
+def create_world(matrix_size, engine, pattern=None, density=0.0, seed=None, num_workers=1,
+                 parallel_threshold=1000000, snapshot=None, rule='B3/S23', history_size=1000):
+    # pattern is the name of one of the PATTERNS or the path of a pattern file; a snapshot sets the board size
+    if snapshot is not None:
+        matrix_size = read_snapshot_header(snapshot)[:2]
+    the_world = World(matrix_size, engine, num_workers=num_workers, parallel_threshold=parallel_threshold, rule=rule,
+                      history_size=history_size)
+    if snapshot is not None:
+        the_world.load_snapshot(snapshot)
+    if density > 0:
+        the_world.fill_random(density, seed)
+    if pattern in PATTERNS:
+        the_world.place_pattern(PATTERNS[pattern])
+    elif pattern is not None:
+        the_world.load_pattern(pattern)
+    return the_world
+
+
+def run_headless(the_world, num_generations, checkpoint_every=None, checkpoint_path=None, stop_on_cycle=True,
+                 jump=False):
+    # steps the world without a window and times only the stepping; peak memory is measured with
+    # tracemalloc from the start of the run, so the board buffers allocated before it are not included.
+    # with checkpoint_every set, a snapshot of the board is written to checkpoint_path every that many generations.
+    # with stop_on_cycle set, the run ends early once the world has found a cycle.
+    # with jump set, the world is moved on with advance() from one checkpoint to the next, or over the whole run
+    # without checkpoints, which is how the hashlife engine gets to use its quadtree. the population is then only
+    # recorded at those points
+    start_generation = the_world.generation
+    generation_list = [0]
+    population_list = [the_world.get_population()]
+    step_time = 0.0
+    tracemalloc.start()
+    if jump:
+        step_size = checkpoint_every or max(num_generations, 1)
+        for i in range(0, num_generations, step_size):
+            step_start = time.perf_counter()
+            the_world.advance(min(step_size, num_generations - i))
+            step_time += time.perf_counter() - step_start
+            generation_list.append(the_world.generation - start_generation)
+            population_list.append(the_world.get_population())
+            if checkpoint_every is not None:
+                the_world.save_snapshot(checkpoint_path)
+    else:
+        for i in range(num_generations):
+            if stop_on_cycle and the_world.period is not None:
+                break
+            step_start = time.perf_counter()
+            the_world.next()
+            step_time += time.perf_counter() - step_start
+            generation_list.append(i + 1)
+            population_list.append(the_world.get_population())
+            if checkpoint_every is not None and (i + 1) % checkpoint_every == 0:
+                the_world.save_snapshot(checkpoint_path)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    num_generations = generation_list[-1]
+    if step_time > 0:
+        generations_per_second = num_generations / step_time
+    else:
+        generations_per_second = float('inf')
+    return {'generations': num_generations,
+            'period': the_world.period,
+            'transient_length': the_world.transient_length,
+            'seconds': step_time,
+            'generations_per_second': generations_per_second,
+            'board_memory': the_world.get_memory_usage(),
+            'peak_memory': peak_memory,
+            'generation_list': generation_list,
+            'population': population_list}
+
+
+def run_benchmark(size_list, engine_list, worker_list, num_generations, density, seed, rule='B3/S23'):
+    # every engine steps the same random board for each size, and the numpy engine is run once per worker count.
+    # hashlife jumps over all the generations at once, since stepping it one generation at a time is just numpy
+    print("cycle detection is off, so the timings leave out the per-generation board hashing")
+    print("{:>8} {:>10} {:>8} {:>12} {:>14} {:>14}".format("size", "engine", "workers", "gens/sec",
+                                                           "board bytes", "peak bytes"))
+    for size in size_list:
+        for engine in engine_list:
+            if engine == 'numpy':
+                engine_worker_list = worker_list
+            else:
+                engine_worker_list = [1]
+            for num_workers in engine_worker_list:
+                the_world = create_world((size, size), engine, density=density, seed=seed, num_workers=num_workers,
+                                         parallel_threshold=0, rule=rule, history_size=0)
+                results = run_headless(the_world, num_generations, jump=(engine == 'hashlife'))
+                the_world.close()
+                print("{:>8} {:>10} {:>8} {:>12.1f} {:>14} {:>14}".format(size, engine, num_workers,
+                                                                          results['generations_per_second'],
+                                                                          results['board_memory'],
+                                                                          results['peak_memory']))
+
+
+def write_population(file_path, generation_list, population_list):
+    f = open(file_path, 'w')
+    f.write("generation,population\n")
+    for i in range(len(population_list)):
+        f.write("{},{}\n".format(generation_list[i], population_list[i]))
+    f.close()
+
+
 def main():
-    matrix_size = (80, 80)
-    square_size = 10
-    the_world = World(matrix_size)
-    the_window = Window(the_world, square_size)
-    the_window.root.mainloop()
+    parser = argparse.ArgumentParser(description="Conway's Game of Life")
+    parser.add_argument('--size', type=int, nargs=2, default=[80, 80], metavar=('ROWS', 'COLUMNS'))
+    parser.add_argument('--engine', default='numpy', choices=World.engine_list)
+    parser.add_argument('--rule', default='B3/S23',
+                        help="B/S rule such as B36/S23, Generations rule such as B2/S/C3, or one of: {}".format(
+                            ', '.join(sorted(RULES))))
+    parser.add_argument('--pattern', default=None,
+                        help="one of {} or an .rle, .cells or .txt pattern file".format(', '.join(sorted(PATTERNS))))
+    parser.add_argument('--snapshot', default=None, help="board snapshot to start from, which also sets the size")
+    parser.add_argument('--save', default=None, help="file for the final board, as .rle, .cells, .txt or .snap")
+    parser.add_argument('--density', type=float, default=0.0, help="fraction of cells that start alive")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--square-size', type=int, default=10)
+    parser.add_argument('--frame-delay', type=float, default=0.1, help="seconds to pause between frames")
+    parser.add_argument('--headless', action='store_true', help="run without a window and report performance")
+    parser.add_argument('--generations', type=int, default=100)
+    parser.add_argument('--output', default=None,
+                        help="csv file for the population of every generation, or of every checkpoint with --jump")
+    parser.add_argument('--checkpoint', default=None, help="snapshot file that headless runs save to periodically")
+    parser.add_argument('--checkpoint-every', type=int, default=1000, help="generations between checkpoints")
+    parser.add_argument('--history-size', type=int, default=1000,
+                        help="generations kept for cycle detection, 0 to turn it off")
+    parser.add_argument('--jump', action='store_true',
+                        help="advance headless runs from checkpoint to checkpoint rather than one generation at a "
+                             "time; headless hashlife runs always jump")
+    parser.add_argument('--run-through-cycles', action='store_true',
+                        help="keep stepping after a still life or oscillator has been found")
+    parser.add_argument('--benchmark', action='store_true', help="compare engines across board sizes")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 64, 128])
+    parser.add_argument('--engines', nargs='+', default=World.engine_list, choices=World.engine_list)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help="processes stepping the numpy engine; the benchmark runs each count given")
+    parser.add_argument('--parallel-threshold', type=int, default=1000000,
+                        help="smallest board, in cells, that is stepped by more than one worker")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        # an empty board would only time the sparse engine skipping it, so benchmarks default to a random fill
+        run_benchmark(args.sizes, args.engines, args.workers, args.generations, args.density or 0.3, args.seed,
+                      args.rule)
+        return
+
+    matrix_size = tuple(args.size)
+    the_world = create_world(matrix_size, args.engine, args.pattern, args.density, args.seed, args.workers[0],
+                             args.parallel_threshold, args.snapshot, args.rule, args.history_size)
+    print("Board memory: {} bytes".format(the_world.get_memory_usage()))
+
+    if args.headless:
+        stop_on_cycle = not args.run_through_cycles
+        jump = args.jump or args.engine == 'hashlife'
+        if args.checkpoint is not None:
+            results = run_headless(the_world, args.generations, args.checkpoint_every, args.checkpoint, stop_on_cycle,
+                                   jump)
+        else:
+            results = run_headless(the_world, args.generations, stop_on_cycle=stop_on_cycle, jump=jump)
+        print("Generations: {}".format(results['generations']))
+        print("Seconds: {:0.3f}".format(results['seconds']))
+        print("Generations/second: {:0.1f}".format(results['generations_per_second']))
+        print("Peak memory: {} bytes".format(results['peak_memory']))
+        print("Final population: {}".format(results['population'][-1]))
+        if results['period'] is not None:
+            print("Cycle: period {} after {} generations".format(results['period'], results['transient_length']))
+        if args.output is not None:
+            write_population(args.output, results['generation_list'], results['population'])
+        if args.save is not None:
+            if is_snapshot_path(args.save):
+                the_world.save_snapshot(args.save)
+            else:
+                the_world.save_pattern(args.save)
+        the_world.close()
+    else:
+        the_window = Window(the_world, args.square_size, args.frame_delay, not args.run_through_cycles)
+        the_window.root.mainloop()
 
 
-main()
+if __name__ == "__main__":
+    main()
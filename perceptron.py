@@ -2,7 +2,13 @@ import tkinter as tk
 from tkinter import ttk
 import numpy as np
 import sys
-import math
+import logging
+import os
+import time
+import argparse
+import tempfile
+import itertools
+import colormap
 
 ############################################################################################################
 ############################################################################################################
@@ -32,10 +38,26 @@ class NeuralNetwork:
             y = 1 / (1 + np.exp(-z))
         elif act_f == 'Threshold':
             y = np.where(z >= 0.0, 1, 0)
+        elif act_f == 'Softmax':
+            # the outputs of each item sum to 1; shifting z by its largest value keeps exp from overflowing. a lone
+            # softmax output would always be 1 and never learn
+            if z.shape[-1] == 1:
+                raise ValueError("Softmax needs at least two outputs, the dataset has one")
+            y = np.exp(z - z.max(-1, keepdims=True))
+            y /= y.sum(-1, keepdims=True)
         else:
             y = z
         return y
 
+    ############################################################################################################
+    def get_accuracy(self, x, y, act_f):
+        # with one output an item is right when the output is on the same side of 0.5 as its label, and with
+        # several outputs when its most active output is the one its label marks
+        y_predict = self.forward(x, act_f)
+        if self.dataset.y_size == 1:
+            return np.mean((y_predict >= 0.5) == (np.asarray(y) >= 0.5))
+        return np.mean(y_predict.argmax(1) == np.asarray(y).argmax(1))
+
     ############################################################################################################
     def train(self, x, y, learning_rate, act_f):
 
@@ -64,25 +86,262 @@ class NeuralNetwork:
 
         return y_predict, y_cost, y_delta
 
+    ############################################################################################################
+    def train_epochs(self, x, y, learning_rate, act_f, num_epochs, full_batch=False):
+        # trains num_epochs passes over x and y and returns the error of each epoch, the mean over items of the
+        # summed squared cost, or of the cross-entropy for softmax outputs. online training updates after every item
+        # as train does, and the error counts each item's prediction before its update. full batch training sums the
+        # delta rule over all items in one vectorized update per epoch, and the error is that of the weights before
+        # the update
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        return self.train_batches([(x, y)], learning_rate, act_f, num_epochs, full_batch)
+
+    ############################################################################################################
+    def train_batches(self, batches, learning_rate, act_f, num_epochs, full_batch=False):
+        # like train_epochs for data that comes as (x, y) mini-batches, e.g. from a ChunkedReader, which is
+        # iterated once per epoch. with full_batch each mini-batch gets one vectorized update, otherwise every item
+        # is trained online. with several outputs, each sigmoid, threshold or linear output learns its own column
+        # of y (one-vs-rest), all in the same matrix update, while softmax outputs are trained on cross-entropy
+        error_trace = np.empty(num_epochs)
+        for epoch in range(num_epochs):
+            cost_sum = 0.0
+            num_items = 0
+            for x, y in batches:
+                if full_batch:
+                    y_predict = self.forward(x, act_f)
+                    y_cost = y - y_predict
+                    y_delta = self.get_delta(y_predict, y_cost, act_f)
+                    self.y_bias += y_delta.sum(0) * learning_rate
+                    self.y_x += np.dot(y_delta.transpose(), x) * learning_rate
+                    cost_sum += self.get_error_sum(y, y_predict, y_cost, act_f)
+                else:
+                    for i in range(x.shape[0]):
+                        y_predict = self.forward(x[i], act_f)
+                        y_cost = y[i] - y_predict
+                        y_delta = self.get_delta(y_predict, y_cost, act_f)
+                        self.y_bias += y_delta * learning_rate
+                        self.y_x += y_delta.transpose() * x[i] * learning_rate
+                        cost_sum += self.get_error_sum(y[i], y_predict, y_cost, act_f)
+                num_items += len(x)
+            error_trace[epoch] = cost_sum / num_items
+        return error_trace
+
+    ############################################################################################################
+    @staticmethod
+    def get_delta(y_predict, y_cost, act_f):
+        # the delta rule as train applies it. for softmax outputs y_cost is already the cross-entropy gradient
+        if act_f == 'Sigmoid':
+            return y_cost * (1/(1+np.exp(-y_predict)) * (1 - 1/(1+np.exp(-y_predict))))
+        return y_cost
+
+    ############################################################################################################
+    @staticmethod
+    def get_error_sum(y, y_predict, y_cost, act_f):
+        if act_f == 'Softmax':
+            return -(y * np.log(np.maximum(y_predict, 1e-12))).sum()
+        return (y_cost ** 2).sum()
+
+    ############################################################################################################
+    @staticmethod
+    def get_boundary_net_input(act_f):
+        # the boundary is where the output crosses 0.5, which for sigmoid and threshold units is at z = 0 and for
+        # linear units at z = 0.5
+        if act_f in ('Sigmoid', 'Threshold'):
+            return 0.0
+        return 0.5
+
+    ############################################################################################################
+    def get_boundary_segments(self, act_f, box=(0, 1, 0, 1), output_index=0, resolution=50):
+        # line segments [(x1, x2), (x1, x2)] of the decision boundary inside box = (x1_min, x1_max, x2_min, x2_max).
+        # the activations forward knows are all monotonic in z, so their boundary is a straight line, solved
+        # directly from the weights; anything else falls back to tracing the 0.5 contour on a grid
+        if act_f in ('Sigmoid', 'Threshold', 'Linear'):
+            segment = self.get_boundary_line(act_f, box, output_index)
+            if segment is None:
+                return []
+            return [segment]
+        return self.get_boundary_contour(act_f, box, output_index, resolution)
+
+    ############################################################################################################
+    def get_boundary_line(self, act_f, box=(0, 1, 0, 1), output_index=0):
+        # the line b0 + b1*x1 + b2*x2 = z clipped to box, or None when it misses the box, or when the weights are
+        # all zero or not finite and there is no line
+        b0 = self.y_bias[0, output_index]
+        b1 = self.y_x[output_index, 0]
+        b2 = self.y_x[output_index, 1]
+        c = self.get_boundary_net_input(act_f) - b0
+        if not np.isfinite([b1, b2, c]).all() or (b1 == 0 and b2 == 0):
+            return None
+        x1_min, x1_max, x2_min, x2_max = box
+
+        # where the line crosses each side of the box, keeping the crossings that lie on the box
+        point_list = []
+        if b2 != 0:
+            for x1 in (x1_min, x1_max):
+                x2 = (c - b1 * x1) / b2
+                if x2_min <= x2 <= x2_max:
+                    point_list.append((float(x1), float(x2)))
+        if b1 != 0:
+            for x2 in (x2_min, x2_max):
+                x1 = (c - b2 * x2) / b1
+                if x1_min <= x1 <= x1_max:
+                    point_list.append((float(x1), float(x2)))
+        if len(point_list) < 2:
+            return None
+        # a line through a corner crosses two sides there, so the segment runs between the two points furthest apart
+        point_list.sort()
+        return [point_list[0], point_list[-1]]
+
+    ############################################################################################################
+    def get_boundary_contour(self, act_f, box=(0, 1, 0, 1), output_index=0, resolution=50):
+        # traces the 0.5 output contour with marching squares over a resolution x resolution grid, evaluated in one
+        # forward pass. returns one segment per grid cell the contour passes through
+        x1_values = np.linspace(box[0], box[1], resolution)
+        x2_values = np.linspace(box[2], box[3], resolution)
+        x1_grid, x2_grid = np.meshgrid(x1_values, x2_values)
+        grid = np.column_stack([x1_grid.ravel(), x2_grid.ravel()])
+        values = self.forward(grid, act_f)[:, output_index].reshape(resolution, resolution) - 0.5
+        above = values >= 0
+
+        # the fraction of the way along each grid edge where the values cross 0.5, for edges between columns
+        # (rows of the grid have constant x2) and edges between rows
+        with np.errstate(divide='ignore', invalid='ignore'):
+            column_t = np.nan_to_num(values[:, :-1] / (values[:, :-1] - values[:, 1:]), nan=0.5)
+            row_t = np.nan_to_num(values[:-1, :] / (values[:-1, :] - values[1:, :]), nan=0.5)
+        column_points = np.stack([x1_grid[:, :-1] + column_t * (x1_values[1] - x1_values[0]), x2_grid[:, :-1]], -1)
+        row_points = np.stack([x1_grid[:-1, :], x2_grid[:-1, :] + row_t * (x2_values[1] - x2_values[0])], -1)
+        column_crossed = above[:, :-1] != above[:, 1:]
+        row_crossed = above[:-1, :] != above[1:, :]
+
+        # the four edges of every cell, in the order bottom, left, top, right
+        crossed = np.stack([column_crossed[:-1, :], row_crossed[:, :-1],
+                            column_crossed[1:, :], row_crossed[:, 1:]], -1)
+        points = np.stack([column_points[:-1, :], row_points[:, :-1],
+                           column_points[1:, :], row_points[:, 1:]], -2)
+        num_crossed = crossed.sum(-1)
+
+        # cells crossed on two edges hold one segment. saddle cells, crossed on all four, get two
+        first_two = np.argsort(~crossed, axis=-1, kind='stable')[..., :2]
+        two_edge_cells = num_crossed == 2
+        cell_points = np.take_along_axis(points, first_two[..., None], axis=-2)[two_edge_cells]
+        saddle_points = points[num_crossed == 4]
+        segments = np.concatenate([cell_points, saddle_points[:, [0, 1]], saddle_points[:, [2, 3]]])
+        return [[(float(point[0]), float(point[1])) for point in segment] for segment in segments]
+
 
 ############################################################################################################
 ############################################################################################################
 class Dataset:
-    def __init__(self):
-        self.items = {"AND": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
-                              np.array([[0], [0], [0], [1]])),
-                      "OR": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
-                              np.array([[0], [1], [1], [1]])),
-                      "XOR": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
-                              np.array([[0], [1], [1], [0]])),
-                      "x1": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
-                              np.array([[0], [0], [1], [1]])),
-                      "x2": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
-                              np.array([[0], [1], [0], [1]]))
-                      }
-        self.n = 4
-        self.x_size = 2
-        self.y_size = 1
+    # the truth tables by default, or a generated dataset of n items with x_size inputs:
+    #   blobs: two gaussian clusters, centers separation apart on the diagonal, labelled 0 and 1; linearly separable
+    #          when separation is large next to stdev
+    #   parity: random 0/1 inputs labelled with their parity, with each label flipped with probability noise
+    #   classes: num_classes gaussian clusters with random centers about separation apart, with one-hot labels and
+    #            so one output per class
+    # generated datasets hold one item set named after the generator
+    generator_list = ['truth tables', 'blobs', 'parity', 'classes']
+
+    def __init__(self, generator='truth tables', n=1000, x_size=2, seed=None, separation=3.0, stdev=1.0,
+                 noise=0.0, num_classes=3):
+        if generator == 'truth tables':
+            self.items = {"AND": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
+                                  np.array([[0], [0], [0], [1]])),
+                          "OR": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
+                                  np.array([[0], [1], [1], [1]])),
+                          "XOR": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
+                                  np.array([[0], [1], [1], [0]])),
+                          "x1": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
+                                  np.array([[0], [0], [1], [1]])),
+                          "x2": (np.array([[0, 0], [0, 1], [1, 0], [1, 1]]),
+                                  np.array([[0], [1], [0], [1]]))
+                          }
+            self.n = 4
+            self.x_size = 2
+            self.y_size = 1
+            return
+
+        random_state = np.random.RandomState(seed)
+        if generator == 'blobs':
+            y = random_state.randint(0, 2, [n, 1])
+            center = (y - 0.5) * separation / np.sqrt(x_size)
+            x = center + random_state.normal(0, stdev, [n, x_size])
+        elif generator == 'parity':
+            x = random_state.randint(0, 2, [n, x_size])
+            y = x.sum(1, keepdims=True) % 2
+            flip = random_state.random_sample([n, 1]) < noise
+            y = np.where(flip, 1 - y, y)
+            x = x.astype(float)
+        elif generator == 'classes':
+            centers = random_state.normal(0, separation / np.sqrt(2 * x_size), [num_classes, x_size])
+            labels = random_state.randint(0, num_classes, n)
+            x = centers[labels] + random_state.normal(0, stdev, [n, x_size])
+            y = np.eye(num_classes)[labels]
+        else:
+            raise ValueError("unknown generator {}, expected one of {}".format(generator, self.generator_list))
+        self.items = {generator: (x, y.astype(float))}
+        self.n = n
+        self.x_size = x_size
+        self.y_size = y.shape[1]
+
+    def scale_inputs(self):
+        # rescales each input column of every item set to run from 0 to 1, e.g. to fit the display's plot
+        for name in self.items:
+            x, y = self.items[name]
+            x_min = x.min(0)
+            x_range = np.maximum(x.max(0) - x_min, 1e-12)
+            self.items[name] = ((x - x_min) / x_range, y)
+
+    def save(self, file_path, name):
+        # writes an item set as rows of inputs followed by outputs, to a .npy file or else a csv file
+        x, y = self.items[name]
+        data = np.hstack([x, y]).astype(float)
+        if file_path.endswith('.npy'):
+            np.save(file_path, data)
+        else:
+            np.savetxt(file_path, data, delimiter=',', fmt='%.17g')
+
+
+############################################################################################################
+############################################################################################################
+class ChunkedReader:
+    # iterates over (x, y) mini-batches of batch_size rows from a .npy file or a csv file with one item per row,
+    # the last y_size columns being the outputs, without loading the whole file. .npy files are memory mapped and
+    # csv files read batch_size lines at a time. every iteration starts again from the top, so a reader can be
+    # trained on for several epochs
+    def __init__(self, file_path, batch_size=1000, y_size=1):
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.y_size = y_size
+        self.is_npy = file_path.endswith('.npy')
+        if self.is_npy:
+            data = np.load(file_path, mmap_mode='r')
+            self.n = data.shape[0]
+            self.x_size = data.shape[1] - y_size
+        else:
+            # csv files are only counted when they are read
+            self.n = None
+            f = open(file_path)
+            self.x_size = len(f.readline().split(',')) - y_size
+            f.close()
+
+    def __iter__(self):
+        if self.is_npy:
+            data = np.load(self.file_path, mmap_mode='r')
+            for start in range(0, data.shape[0], self.batch_size):
+                batch = np.array(data[start:start+self.batch_size], dtype=float)
+                yield batch[:, :self.x_size], batch[:, self.x_size:]
+        else:
+            f = open(self.file_path)
+            try:
+                while True:
+                    lines = list(itertools.islice(f, self.batch_size))
+                    if not lines:
+                        break
+                    batch = np.loadtxt(lines, delimiter=',', ndmin=2)
+                    yield batch[:, :self.x_size], batch[:, self.x_size:]
+            finally:
+                f.close()
 
 
 ############################################################################################################
@@ -95,7 +354,7 @@ class Display:
         self.act_f = 'Sigmoid'
         self.learning_rate = 0.10
 
-        self.dataset = 'AND'
+        self.dataset = list(self.network.dataset.items)[0]
         self.current_item_index = 0
         self.current_x = self.network.dataset.items[self.dataset][0][self.current_item_index]
         self.current_y = self.network.dataset.items[self.dataset][1][self.current_item_index]
@@ -106,6 +365,13 @@ class Display:
         self.x0_pos = (100, 350)
         self.x1_pos = (250, 500)
         self.x2_pos = (450, 500)
+        # networks with several outputs show them side by side around y0_pos, but never more than
+        # max_drawn_outputs of them, so a redraw costs the same however many outputs there are
+        self.max_drawn_outputs = 8
+        # the row of outputs is moved right when it would reach under the activation function panel, whose texts
+        # end at about x = 240
+        self.output_row_min_x = 260
+        self.output_colors = ['yellow', 'cyan', 'magenta', 'orange', 'white', 'purple', 'brown', 'pink']
 
         self.root = tk.Tk()
 
@@ -137,14 +403,18 @@ class Display:
 
         self.network.train(x, y, self.learning_rate, self.act_f)
 
+    def train_epochs(self, num_epochs):
+        x = self.network.dataset.items[self.dataset][0]
+        y = self.network.dataset.items[self.dataset][1]
+
+        return self.network.train_epochs(x, y, self.learning_rate, self.act_f, num_epochs)
+
     def train10(self):
-        for i in range(10):
-            self.train()
+        self.train_epochs(10)
         self.draw_network_frame()
 
     def train100(self):
-        for i in range(100):
-            self.train()
+        self.train_epochs(100)
         self.draw_network_frame()
 
     def train1(self):
@@ -161,7 +431,8 @@ class Display:
         sys.exit()
 
     def draw_network_frame(self):
-        self.network_canvas.delete("all")
+        # everything but the static layer, which is drawn once and kept, is redrawn from scratch
+        self.network_canvas.delete("!static")
         self.draw_weights()
         self.draw_nodes()
         self.draw_items()
@@ -169,16 +440,42 @@ class Display:
         self.draw_activation_functions()
         self.root.update()
 
+    def get_output_layout(self):
+        # the centers and radius of the drawn output units, which shrink to fit 360 pixels when there are many
+        num_drawn = min(self.network.dataset.y_size, self.max_drawn_outputs)
+        spacing = min(2.5 * self.node_radius, 360 / num_drawn)
+        radius = min(self.node_radius, spacing * 0.4)
+        first_x = max(self.y0_pos[0] - spacing * (num_drawn - 1) / 2, self.output_row_min_x + radius)
+        return [(first_x + spacing * k, self.y0_pos[1]) for k in range(num_drawn)], radius
+
     def draw_nodes(self):
         x = self.current_x
         y = self.network.forward(x, self.act_f)
-        self.y0 = self.network_canvas.create_oval(self.y0_pos[0]-self.node_radius, self.y0_pos[1]-self.node_radius,
-                                                  self.y0_pos[0]+self.node_radius, self.y0_pos[1]+self.node_radius,
-                                                  width=self.thickness, fill=self.get_hex_color(y[0][0]))
-        self.network_canvas.create_text(self.y0_pos[0], self.y0_pos[1]-self.node_radius*1.5,
-                                        text="y".format(y[0][0]), font="Arial 16 bold")
-        self.network_canvas.create_text(self.y0_pos[0], self.y0_pos[1],
-                                        text="{:0.3f}".format(y[0][0]), font="Arial 16 bold")
+        output_positions, radius = self.get_output_layout()
+        if radius == self.node_radius:
+            font = "Arial 16 bold"
+            value_format = "{:0.3f}"
+        else:
+            font = "Arial 9 bold"
+            value_format = "{:0.2f}"
+        for k in range(len(output_positions)):
+            position = output_positions[k]
+            oval = self.network_canvas.create_oval(position[0]-radius, position[1]-radius,
+                                                   position[0]+radius, position[1]+radius,
+                                                   width=self.thickness, fill=self.get_hex_color(y[0][k]))
+            if k == 0:
+                self.y0 = oval
+            if self.network.dataset.y_size == 1:
+                label = "y"
+            else:
+                label = "y{}".format(k + 1)
+            self.network_canvas.create_text(position[0], position[1]-radius*1.5, text=label, font=font)
+            self.network_canvas.create_text(position[0], position[1], text=value_format.format(y[0][k]), font=font)
+        num_hidden_outputs = self.network.dataset.y_size - len(output_positions)
+        if num_hidden_outputs > 0:
+            self.network_canvas.create_text(output_positions[-1][0] + 2 * radius, self.y0_pos[1],
+                                            text="+{} more".format(num_hidden_outputs), font="Arial 11 bold",
+                                            anchor=tk.W)
 
         self.x0 = self.network_canvas.create_oval(self.x0_pos[0] - self.node_radius, self.x0_pos[1] - self.node_radius,
                                                   self.x0_pos[0] + self.node_radius, self.x0_pos[1] + self.node_radius,
@@ -206,29 +503,32 @@ class Display:
                                         text="{:0.0f}".format(x[1]), font="Arial 16 bold")
 
     def draw_weights(self):
+        # lines from the bias and both inputs to every drawn output unit. the labels, which can be clicked to edit
+        # a weight, are for the first output
+        output_positions, radius = self.get_output_layout()
         b0_x1 = self.x0_pos[0]+(self.node_radius/(2**0.5))
-        b0_x2 = self.y0_pos[0]
         b0_y1 = self.x0_pos[1]-(self.node_radius/(2**0.5))
-        b0_y2 = self.y0_pos[1]+self.node_radius
-        self.b0 = self.network_canvas.create_line(b0_x1, b0_y1, b0_x2, b0_y2,
-                                                  width=self.thickness,
-                                                  fill=self.get_hex_color(self.network.y_bias[0][0]))
+        for k in range(len(output_positions)-1, -1, -1):
+            output_x = output_positions[k][0]
+            output_y = output_positions[k][1] + radius
+            self.b0 = self.network_canvas.create_line(b0_x1, b0_y1, output_x, output_y,
+                                                      width=self.thickness,
+                                                      fill=self.get_hex_color(self.network.y_bias[0][k]))
+            self.b1 = self.network_canvas.create_line(self.x1_pos[0], self.x1_pos[1]-self.node_radius,
+                                                      output_x, output_y,
+                                                      width=self.thickness,
+                                                      fill=self.get_hex_color(self.network.y_x[k][0]))
+            self.b2 = self.network_canvas.create_line(self.x2_pos[0], self.x2_pos[1]-self.node_radius,
+                                                      output_x, output_y,
+                                                      width=self.thickness,
+                                                      fill=self.get_hex_color(self.network.y_x[k][1]))
 
         self.network_canvas.create_text(self.y0_pos[0]-160, self.y0_pos[1]+80,
                                         text="b0 = {:0.3f}".format(self.network.y_bias[0][0]),
                                         font="Arial 16 bold", fill="black", tags='b0')
-
-        self.b1 = self.network_canvas.create_line(self.x1_pos[0], self.x1_pos[1]-self.node_radius,
-                                                  self.y0_pos[0], self.y0_pos[1]+self.node_radius,
-                                                  width=self.thickness, fill=self.get_hex_color(self.network.y_x[0][0]))
         self.network_canvas.create_text(self.y0_pos[0]-80, self.y0_pos[1]+150,
                                         text="b1 = {:0.3f}".format(self.network.y_x[0][0]),
                                         font="Arial 16 bold", fill="black", tags='b1')
-
-
-        self.b2 = self.network_canvas.create_line(self.x2_pos[0], self.x2_pos[1]-self.node_radius,
-                                                  self.y0_pos[0], self.y0_pos[1]+self.node_radius,
-                                                  width=self.thickness, fill=self.get_hex_color(self.network.y_x[0][1]))
         self.network_canvas.create_text(self.y0_pos[0]+80, self.y0_pos[1]+150,
                                         text="b2 = {:0.3f}".format(self.network.y_x[0][1]),
                                         font="Arial 16 bold", fill="black", tags='b2')
@@ -249,74 +549,68 @@ class Display:
                                         width=self.thickness, fill="black")
         self.network_canvas.create_line(start_x+30, start_y+30, start_x+30, start_y+170,
                                         width=self.thickness, fill="black")
-        for i in range(self.network.dataset.n):
+        # the table has room for four items. with several outputs y is the class an item is labelled with and the
+        # prediction is the most active output and its value
+        for i in range(min(self.network.dataset.n, 4)):
             x = self.network.dataset.items[self.dataset][0][i]
-            y = self.network.dataset.items[self.dataset][1][i][0]
             y_predict = self.network.forward(x, self.act_f)
-            items = "{:0.0f}       {:0.0f}         {:0.0f}     {:0.3f}".format(x[0], x[1], y, y_predict[0,0])
+            if self.network.dataset.y_size == 1:
+                y = self.network.dataset.items[self.dataset][1][i][0]
+                items = "{:0.2g}       {:0.2g}         {:0.0f}     {:0.3f}".format(x[0], x[1], y, y_predict[0,0])
+            else:
+                y = np.argmax(self.network.dataset.items[self.dataset][1][i]) + 1
+                k = np.argmax(y_predict[0])
+                items = "{:0.2g}       {:0.2g}         {}     y{} {:0.2f}".format(x[0], x[1], y, k + 1, y_predict[0, k])
             tag = "item" + str(i)
             self.network_canvas.create_text(start_x+40, start_y+35+(i+1)*30, text=items, font="Arial 16 bold", fill="black", tags=tag)
 
     def draw_boundary(self):
 
         self.network_canvas.create_text(665, 350, text="Decision Boundary", font="Arial 20 bold", fill="#000000")
-        precision = 0.01
-        y1 = -100
-        n = 100
-        y1_predict = 0
-        while abs(y1_predict - 0.50) > precision:
-            y1_predict = self.network.forward([0, y1], self.act_f)[0, 0]
-            y1 += 1/n
-            if y1 > 100:
-                break
-        y2 = -100
-        n = 100
-        y2_predict = 0
-        while abs(y2_predict - 0.50) > precision:
-            y2_predict = self.network.forward([1, y2], self.act_f)[0, 0]
-            y2 += 1/n
-            if y2 > 100:
-                break
-        m = (y2-y1)
-        b = y1
-        equation = "y = {:0.3f}x + {:0.3f}".format(m, b)
+        # x2 = m*x1 + b along the boundary line, which is only a function of x1 when b2 is not 0
+        b1 = self.network.y_x[0, 0]
+        b2 = self.network.y_x[0, 1]
+        c = self.network.get_boundary_net_input(self.act_f) - self.network.y_bias[0, 0]
+        if b2 != 0:
+            equation = "y = {:0.3f}x + {:0.3f}".format(-b1 / b2, c / b2)
+        elif b1 != 0:
+            equation = "x = {:0.3f}".format(c / b1)
+        else:
+            equation = "no boundary"
         self.network_canvas.create_text(665, 380, text=equation, font="Arial 14 bold", fill="#000000")
         x_is_0 = 620
         y_is_0 = 540
         scale = 100
 
-        coord_list = []
-        x = -1
-        for i in range(300):
-            y = m * x + b
-            if -1 <= y <= 2:
-                coord_list.append((x, y))
-            x += 0.01
-
         self.network_canvas.create_line(x_is_0, y_is_0, x_is_0+scale, y_is_0, width=self.thickness)
         self.network_canvas.create_line(x_is_0, y_is_0, x_is_0, y_is_0-scale, width=self.thickness)
         self.network_canvas.create_line(x_is_0, y_is_0-scale, x_is_0 + scale, y_is_0-scale, width=self.thickness)
         self.network_canvas.create_line(x_is_0+scale, y_is_0, x_is_0 + scale, y_is_0-scale, width=self.thickness)
 
-        if len(coord_list) > 1:
-            self.network_canvas.create_line(x_is_0+coord_list[0][0]*scale,
-                                            y_is_0-coord_list[0][1]*scale,
-                                            x_is_0 + coord_list[-1][0] * scale,
-                                            y_is_0 - coord_list[-1][1] * scale,
-                                            width=self.thickness, fill='yellow')
+        # one boundary for each drawn output unit, in that unit's color
+        for k in range(min(self.network.dataset.y_size, self.max_drawn_outputs)):
+            for segment in self.network.get_boundary_segments(self.act_f, output_index=k):
+                self.network_canvas.create_line(x_is_0 + segment[0][0] * scale,
+                                                y_is_0 - segment[0][1] * scale,
+                                                x_is_0 + segment[1][0] * scale,
+                                                y_is_0 - segment[1][1] * scale,
+                                                width=self.thickness, fill=self.output_colors[k])
 
         x_is_0 = 620
         y_is_0 = 440
         scale = 100
         node_radius = 4
-        for i in range(self.network.dataset.n):
+        for i in range(min(self.network.dataset.n, 4)):
             x1 = self.network.dataset.items[self.dataset][0][i][0]
             x2 = self.network.dataset.items[self.dataset][0][i][1]
-            y = self.network.dataset.items[self.dataset][1][i][0]
-            if y == 1:
-                color = 'green'
+            if self.network.dataset.y_size == 1:
+                if self.network.dataset.items[self.dataset][1][i][0] == 1:
+                    color = 'green'
+                else:
+                    color = 'red'
             else:
-                color = 'red'
+                label = np.argmax(self.network.dataset.items[self.dataset][1][i])
+                color = self.output_colors[label % len(self.output_colors)]
             self.network_canvas.create_oval(x_is_0 + scale * x1 - node_radius,
                                             y_is_0 + scale * abs(x2 - 1) - node_radius,
                                             x_is_0 + scale * x1 + node_radius,
@@ -332,54 +626,56 @@ class Display:
         x_scale = 200
         y_scale = 100
 
-        intervals = np.linspace(-5, 5, 100)
-        curve_list = []
-        for z in intervals:
-            y = 1 / (1 + math.exp(-z))
-            curve_list.append((z, y))
-            print(z, y)
-        for i in range(len(intervals)-1):
-            x1 = x_is_min + (x_scale * (curve_list[i][0] + 5)) / 10
-            y1 = y_is_0 - curve_list[i][1] * y_scale
-            x2 = x_is_min + (x_scale * (curve_list[i+1][0] + 5)) / 10
-            y2 = y_is_0 - curve_list[i+1][1] * y_scale
-            self.network_canvas.create_line(x1, y1, x2, y2, width=self.thickness, fill='yellow')
+        # the curve, axes and labels never change, so they are drawn on the first frame as items tagged static,
+        # along with the marker lines and z text that later frames only move and rewrite
+        if not self.network_canvas.find_withtag('activation_curve'):
+            self.draw_activation_curve(x_is_min, y_is_0, x_scale, y_scale)
 
         x = self.current_x
         z = self.network.net_input(x)[0,0]
         y = self.network.forward(x, self.act_f)[0,0]
-        print(x, z, y)
-        print('x1={} + {}*({}+5)'.format(x_is_min, x_scale, z))
+        logging.debug("x=%s z=%s y=%s", x, z, y)
         x1 = x_is_min + (x_scale*(z+5))/10
         y1 = y_is_0 - y*y_scale
-        x2 = x_is_min + (x_scale*(z+5))/10
-        y2 = y_is_0 - y*y_scale
-        print((x1, y1), (x2, y2))
-        self.network_canvas.create_line(x1, y_is_0, x2, y_is_0-y_scale, width=self.thickness, fill='orange')
-        self.network_canvas.create_line(x_is_min, y1, x_is_min+x_scale, y2, width=self.thickness, fill='orange')
-
-        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0-y_scale-30, text="y Activation Function", font="Arial 14 bold", fill="#000000")
-        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0-y_scale-15, text="y = 1 / (1 + e^-z)", font="Arial 12 bold",
-                                        fill="#000000")
-        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0+10, text="z = 0", font="Arial 11 bold", fill="#000000")
-        self.network_canvas.create_text(x_is_min+x_scale, y_is_0+10, text="z = +5", font="Arial 11 bold", fill="#000000")
-        self.network_canvas.create_text(x_is_min, y_is_0+10, text="z = -5", font="Arial 11 bold", fill="#000000")
-        self.network_canvas.create_text(x_is_min+x_scale*0.5-13, y_is_0-10, text="y=0", font="Arial 11 bold", fill="#000000")
-        self.network_canvas.create_text(x_is_min+x_scale*0.5 - 16, y_is_0 - 0.5*y_scale, text="y=0.5", font="Arial 11 bold", fill="#000000")
-        self.network_canvas.create_text(x_is_min+x_scale*0.5 - 13, y_is_0 - y_scale, text="y=1", font="Arial 11 bold", fill="#000000")
-        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0 + 25, text="z = b0*1 + b1*x1 + b2*x2", font="Arial 11 bold",
-                                        fill="#000000")
+        logging.debug("activation markers at x=%s y=%s", x1, y1)
+        self.network_canvas.coords('activation_z_marker', x1, y_is_0, x1, y_is_0-y_scale)
+        self.network_canvas.coords('activation_y_marker', x_is_min, y1, x_is_min+x_scale, y1)
 
         b0 = self.network.y_bias[0, 0]
         b1 = self.network.y_x[0, 0]
         b2 = self.network.y_x[0, 1]
-        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0 + 40,
-                                        text="z = {:0.2f} + {:0.2f} + {:0.2f} = {:0.2f}".format(b0, b1*x[0], b2*x[1], z),
-                                        font="Arial 11 bold",
-                                        fill="#000000")
+        self.network_canvas.itemconfig('activation_z_text',
+                                       text="z = {:0.2f} + {:0.2f} + {:0.2f} = {:0.2f}".format(b0, b1*x[0], b2*x[1], z))
+
+    def draw_activation_curve(self, x_is_min, y_is_0, x_scale, y_scale):
+        # the sigmoid over z from -5 to 5 as a single 100 point line
+        z = np.linspace(-5, 5, 100)
+        y = 1 / (1 + np.exp(-z))
+        curve_coords = np.column_stack([x_is_min + (x_scale * (z + 5)) / 10, y_is_0 - y * y_scale]).ravel()
+        self.network_canvas.create_line(*curve_coords, width=self.thickness, fill='yellow',
+                                        tags=('static', 'activation_curve'))
+
+        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0-y_scale-30, text="y Activation Function", font="Arial 14 bold", fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0-y_scale-15, text="y = 1 / (1 + e^-z)", font="Arial 12 bold",
+                                        fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0+10, text="z = 0", font="Arial 11 bold", fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale, y_is_0+10, text="z = +5", font="Arial 11 bold", fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min, y_is_0+10, text="z = -5", font="Arial 11 bold", fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale*0.5-13, y_is_0-10, text="y=0", font="Arial 11 bold", fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale*0.5 - 16, y_is_0 - 0.5*y_scale, text="y=0.5", font="Arial 11 bold", fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale*0.5 - 13, y_is_0 - y_scale, text="y=1", font="Arial 11 bold", fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0 + 25, text="z = b0*1 + b1*x1 + b2*x2", font="Arial 11 bold",
+                                        fill="#000000", tags='static')
+        self.network_canvas.create_text(x_is_min+x_scale*0.5, y_is_0 + 40, text="", font="Arial 11 bold",
+                                        fill="#000000", tags=('static', 'activation_z_text'))
+
+        self.network_canvas.create_line(x_is_min+x_scale*0.5, y_is_0, x_is_min+x_scale*0.5, y_is_0-y_scale, width=self.thickness, tags='static')
+        self.network_canvas.create_line(x_is_min, y_is_0, x_is_min+x_scale, y_is_0, width=self.thickness, tags='static')
 
-        self.network_canvas.create_line(x_is_min+x_scale*0.5, y_is_0, x_is_min+x_scale*0.5, y_is_0-y_scale, width=self.thickness)
-        self.network_canvas.create_line(x_is_min, y_is_0, x_is_min+x_scale, y_is_0, width=self.thickness)
+        self.network_canvas.create_line(0, 0, 0, 0, width=self.thickness, fill='orange',
+                                        tags=('static', 'activation_z_marker'))
+        self.network_canvas.create_line(0, 0, 0, 0, width=self.thickness, fill='orange',
+                                        tags=('static', 'activation_y_marker'))
 
     def network_click(self, event):
         x, y = event.x, event.y
@@ -392,16 +688,9 @@ class Display:
                 self.current_y = self.network.dataset.items[self.dataset][1][self.current_item_index]
                 self.draw_network_frame()
             elif the_tag == 'dataset_button':
-                if self.dataset == 'AND':
-                    self.dataset = 'OR'
-                elif self.dataset == 'OR':
-                    self.dataset = 'XOR'
-                elif self.dataset == 'XOR':
-                    self.dataset = 'x1'
-                elif self.dataset == 'x1':
-                    self.dataset = 'x2'
-                elif self.dataset == 'x2':
-                    self.dataset = 'AND'
+                # steps through the item sets in order, AND, OR, XOR, x1 and x2 for the truth tables
+                name_list = list(self.network.dataset.items)
+                self.dataset = name_list[(name_list.index(self.dataset) + 1) % len(name_list)]
                 self.draw_network_frame()
             elif the_tag in ['b0', 'b1', 'b2']:
                 tk.Message(text='Change Weight?')
@@ -411,24 +700,7 @@ class Display:
 
     @staticmethod
     def get_hex_color(value):
-        if value > 1:
-            value = 1
-        if value < -1:
-            value = -1
-
-        abs_value = 1 - abs(value)
-        scaled_value = int(round(255 * abs_value, 0))
-        hex_value = hex(scaled_value)[2:]
-
-        if len(hex_value) == 1:
-            hex_value = "0" + hex_value
-
-        if value > 0:
-            return '#{}ff{}'.format(hex_value, hex_value)
-        elif value < 0:
-            return '#ff{}{}'.format(hex_value, hex_value)
-        else:
-            return "#ffffff"
+        return colormap.get_hex_color(value)
 
 
 ############################################################################################################
@@ -458,12 +730,102 @@ class GetWeightDialog:
 
 ############################################################################################################
 ############################################################################################################
+def run_benchmark(size_list, x_size, num_epochs, act_f, learning_rate, batch_size):
+    # training throughput on gaussian blobs as n grows, online and full batch from memory and in mini-batches
+    # streamed from .npy and csv files. batch updates scale the learning rate down by the batch size, so that every
+    # mode takes steps of about the same size
+    print("{:>10} {:>18} {:>14} {:>10}".format("n", "mode", "items/sec", "error"))
+    temp_dir = tempfile.mkdtemp()
+    for n in size_list:
+        the_dataset = Dataset('blobs', n, x_size, seed=0)
+        x, y = the_dataset.items['blobs']
+        npy_path = os.path.join(temp_dir, 'blobs.npy')
+        csv_path = os.path.join(temp_dir, 'blobs.csv')
+        the_dataset.save(npy_path, 'blobs')
+        the_dataset.save(csv_path, 'blobs')
+
+        mode_list = [('online', [(x, y)], False, learning_rate),
+                     ('full batch', [(x, y)], True, learning_rate / n),
+                     ('npy mini-batches', ChunkedReader(npy_path, batch_size), True, learning_rate / batch_size),
+                     ('csv mini-batches', ChunkedReader(csv_path, batch_size), True, learning_rate / batch_size)]
+        for mode, batches, full_batch, mode_learning_rate in mode_list:
+            np.random.seed(0)
+            the_network = NeuralNetwork(the_dataset)
+            start_time = time.perf_counter()
+            error_trace = the_network.train_batches(batches, mode_learning_rate, act_f, num_epochs, full_batch)
+            seconds = time.perf_counter() - start_time
+            print("{:>10} {:>18} {:>14.0f} {:>10.4f}".format(n, mode, n * num_epochs / seconds, error_trace[-1]))
+        os.remove(npy_path)
+        os.remove(csv_path)
+    os.rmdir(temp_dir)
+
+
+def run_class_benchmark(class_count_list, x_size, n, num_epochs, learning_rate):
+    # held out accuracy and full batch training throughput on generated multi-class data, for one-vs-rest sigmoid
+    # outputs and for softmax outputs. each dataset is generated at twice n and split in half for training and
+    # testing, and the learning rate is scaled down by n as in run_benchmark
+    print("{:>8} {:>10} {:>14} {:>12} {:>10}".format("classes", "act_f", "items/sec", "accuracy", "error"))
+    for num_classes in class_count_list:
+        the_dataset = Dataset('classes', 2 * n, x_size, seed=0, num_classes=num_classes)
+        x, y = the_dataset.items['classes']
+        for act_f in ['Sigmoid', 'Softmax']:
+            np.random.seed(0)
+            the_network = NeuralNetwork(the_dataset)
+            start_time = time.perf_counter()
+            error_trace = the_network.train_epochs(x[:n], y[:n], learning_rate / n, act_f, num_epochs, True)
+            seconds = time.perf_counter() - start_time
+            accuracy = the_network.get_accuracy(x[n:], y[n:], act_f)
+            print("{:>8} {:>10} {:>14.0f} {:>12.3f} {:>10.4f}".format(num_classes, act_f, n * num_epochs / seconds,
+                                                                      accuracy, error_trace[-1]))
+
+
 def main():
-    the_datasets = Dataset()
+    parser = argparse.ArgumentParser(description="Single layer perceptron")
+    parser.add_argument('--benchmark', action='store_true', help="report training throughput on generated data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--dimensions', type=int, default=100, help="inputs per generated item")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--act-f', default='Sigmoid', choices=['Sigmoid', 'Threshold', 'Linear', 'Softmax'])
+    parser.add_argument('--learning-rate', type=float, default=0.01)
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per mini-batch read from a file")
+    parser.add_argument('--class-benchmark', action='store_true',
+                        help="compare one-vs-rest sigmoid and softmax outputs on generated multi-class data")
+    parser.add_argument('--classes', type=int, nargs='+', default=[3, 10, 30])
+    parser.add_argument('--n', type=int, default=10000, help="training items for the class benchmark")
+    parser.add_argument('--class-epochs', type=int, default=200,
+                        help="epochs for the class benchmark, which needs many more full batch epochs than --epochs")
+    parser.add_argument('--class-learning-rate', type=float, default=1.0,
+                        help="learning rate for the class benchmark, scaled down by --n")
+    parser.add_argument('--data', default='truth tables', choices=Dataset.generator_list,
+                        help="dataset the display opens on; generated data has 2 inputs, scaled to the plotted square")
+    parser.add_argument('--display-classes', type=int, default=3, help="classes, and so outputs, of --data classes")
+    parser.add_argument('--display-n', type=int, default=100, help="items generated for the display")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the data generated for the display")
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="DEBUG logs the activation markers on every redraw")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+
+    if args.benchmark:
+        if args.act_f == 'Softmax':
+            parser.error("the benchmark's blobs have one output, which Softmax cannot train; use --class-benchmark")
+        run_benchmark(args.sizes, args.dimensions, args.epochs, args.act_f, args.learning_rate, args.batch_size)
+        return
+
+    if args.class_benchmark:
+        run_class_benchmark(args.classes, args.dimensions, args.n, args.class_epochs, args.class_learning_rate)
+        return
+
+    if args.data == 'truth tables':
+        the_datasets = Dataset()
+    else:
+        the_datasets = Dataset(args.data, args.display_n, 2, seed=args.seed, num_classes=args.display_classes)
+        the_datasets.scale_inputs()
     the_network = NeuralNetwork(the_datasets)
     np.set_printoptions(suppress=True, precision=3)
     the_display = Display(the_network)
     the_display.root.mainloop()
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import tkinter as tk
 import sys
 import time
 import numpy as np
+import colormap
 
 
 class Network:
@@ -180,16 +181,12 @@ class Display:
         size = 6
         spacing = 3
 
+        # weights are scaled down by 10 and colored in one pass over the whole matrix
+        colors = colormap.get_hex_colors(self.network.weight_matrix / 10)
         for i in range(self.network.num_nodes):
             self.weight_canvas.create_text(30, 23 + i * 9, font='Arial 7', text=self.dataset.label_list[i])
             for j in range(self.network.num_nodes):
-
-                scaled_weight = self.network.weight_matrix[i, j] / 10
-                if scaled_weight > 1:
-                    scaled_weight = 1
-                if scaled_weight < -1:
-                    scaled_weight = -1
-                color = self.get_hex_color(scaled_weight)
+                color = colors[i, j]
 
                 self.weight_canvas.create_rectangle(x + j * (size + spacing), y + i * (size + spacing),
                                                     x + j * (spacing + size) + size, y + i * (spacing + size) + size,
@@ -245,9 +242,10 @@ class Display:
         self.network_canvas.create_text(160, 10,
                                         text="Network Activation (activation steps={})".format(self.network.time_steps),
                                         font="Arial 12 bold")
+        colors = colormap.get_hex_colors(self.network.activations)
         for i in range(self.network.num_nodes):
             coords = self.node_coordinate_list[i]
-            color = self.get_hex_color(self.network.activations[i])
+            color = colors[i]
 
             if self.selected_node_array[i] == 0:
                 self.network_canvas.create_oval(coords[0],
@@ -282,19 +280,7 @@ class Display:
 
     @staticmethod
     def get_hex_color(value):
-        abs_value = 1 - abs(value)
-        scaled_value = int(round(255 * abs_value, 0))
-        hex_value = hex(scaled_value)[2:]
-
-        if len(hex_value) == 1:
-            hex_value = "0" + hex_value
-
-        if value > 0:
-            return '#{}ff{}'.format(hex_value, hex_value)
-        elif value < 0:
-            return '#ff{}{}'.format(hex_value, hex_value)
-        else:
-            return "#ffffff"
+        return colormap.get_hex_color(value)
 
 
 class Dataset: